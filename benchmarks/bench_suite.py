@@ -0,0 +1,261 @@
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modules.DB_manager import DBManager, Changeset
+from modules.vocabulary import Vocabulary, Netzverb, HTML_PARSER
+
+""" Benchmark suite for the hot paths: DB filter modes and writes, page parsing, tagging and table rendering.
+    run with: python benchmarks/bench_suite.py --rows 100k [--baseline results/baseline.json] [--save results/baseline.json]
+    Synthetic databases are generated once per size and seed into benchmarks/data/ and reused."""
+
+HERE = Path(__file__).parent
+FIXTURES = HERE / "fixtures"
+DATA = HERE / "data"
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+MODES = ["all", "new", "duplicates", "nouns", "verbs", "adjectives", "other"]
+LANGUAGES = ("en", "uk")
+
+# MARK: Synthetic vocabulary
+SYLLABLES = ["ge", "be", "ver", "an", "auf", "aus", "ein", "haus", "land", "zeit", "wort", "stra", "ße", "bau",
+             "spiel", "schön", "grün", "lauf", "fahr", "kind", "tag", "nacht", "licht", "ung", "heit", "keit",
+             "lich", "ig", "en", "er", "el", "ü", "ä", "ö", "ber", "mal", "kunst", "wald", "berg", "see"]
+TYPES = ["der", "die", "das", "VERB", "ADJ", "ADV", "AUX", "ADP", "NOUN", "PROPN", "X"]
+TYPE_WEIGHTS = [15, 15, 10, 20, 10, 5, 2, 3, 8, 2, 10]
+
+def synthetic_rows(n, seed=0, duplicates=0.03):
+    rnd = random.Random(seed)
+    seen = []
+    for i in range(n):
+        if seen and rnd.random() < duplicates: # an exact (type, german) repeat
+            word_type, german = rnd.choice(seen)
+        else:
+            word_type = rnd.choices(TYPES, TYPE_WEIGHTS)[0]
+            german = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4)))
+            german = german.capitalize() if word_type in ("der", "die", "das", "NOUN", "PROPN") else german
+            if len(seen) < 10_000: seen.append((word_type, german))
+        text = lambda words: " ".join(rnd.choice(SYLLABLES) + rnd.choice(SYLLABLES) for _ in range(words))
+        yield {
+            "type": word_type,
+            "german": german,
+            "translation": text(2) if rnd.random() > 0.05 else None,
+            "second_translation": text(2) if rnd.random() > 0.2 else None,
+            "example": text(8) if rnd.random() > 0.3 else None,
+            "meaning": text(6) if rnd.random() > 0.3 else None,
+            "score": rnd.choice([0, 0, -1, 1, 2, 3]),
+        }
+
+def synthetic_db(rows, seed=0) -> Path:
+    path = DATA / f"vocabulary_{rows}_{seed}.db"
+    if path.exists(): return path
+    DATA.mkdir(exist_ok=True)
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+    db = DBManager(partial)
+    db.create_table()
+    batch = []
+    for row in synthetic_rows(rows, seed):
+        batch.append(row)
+        if len(batch) == 10_000:
+            db.insert_data(batch)
+            batch = []
+    if batch: db.insert_data(batch)
+    db.close()
+    partial.rename(path)
+    return path
+
+# MARK: Timing
+def timed(function, repeat=5, number=1) -> dict:
+    # median and min of `repeat` runs, each calling the function `number` times (seconds per call)
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number): function()
+        runs.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(runs), "min": min(runs)}
+
+# MARK: Benchmarks
+def bench_db(path, repeat) -> dict:
+    results = {}
+    db = DBManager(path)
+    for mode in MODES:
+        results[f"db.fetch_data.{mode}"] = timed(lambda: db.fetch_data(mode), repeat)
+        results[f"db.fetch_page.{mode}"] = timed(lambda: db.fetch_page(mode, 200, "german"), repeat, number=10)
+        results[f"db.count_rows.{mode}"] = timed(lambda: db.count_rows(mode), repeat, number=100)
+    results["db.statistics"] = timed(db.statistics, repeat, number=100)
+    results["db.build_deck"] = timed(lambda: db.build_deck("all", 20), repeat)
+    results["db.search"] = timed(lambda: db.search("haus", 200), repeat, number=10)
+    db.close()
+    return results
+
+def bench_writes(path, repeat, rows=1000) -> dict:
+    # on a copy of the synthetic DB, throughput in rows per second
+    copy = path.with_suffix(".writes")
+    with sqlite3.connect(path) as source, sqlite3.connect(copy) as target:
+        source.backup(target)
+    db = DBManager(copy)
+    new_rows = list(synthetic_rows(rows, seed=1))
+    results = {}
+
+    def insert():
+        db.insert_data([dict(row) for row in new_rows])
+    results["db.insert"] = timed(insert, repeat)
+
+    last = db.last_rowid()
+    def update():
+        changes = Changeset()
+        for rowid in range(last - rows + 1, last + 1):
+            changes.set(rowid, "translation", "updated")
+            changes.set(rowid, "score", 1)
+        db.apply_changeset(changes)
+    results["db.update"] = timed(update, repeat)
+
+    def delete():
+        start = db.last_rowid() - rows + 1
+        db.delete_data([{"rowid": rowid} for rowid in range(start, start + rows)])
+    results["db.delete"] = timed(delete, repeat)
+
+    for name in ("db.insert", "db.update", "db.delete"):
+        results[name]["rows_per_second"] = rows / results[name]["median"]
+    db.close()
+    copy.unlink()
+    for suffix in ("-wal", "-shm"): Path(f"{copy}{suffix}").unlink(missing_ok=True)
+    return results
+
+def bench_parse(repeat) -> dict:
+    results = {}
+    for page in sorted(FIXTURES.glob("*.html")):
+        content = page.read_bytes()
+        results[f"parse.{page.stem}"] = timed(
+            lambda: Netzverb.parse_page(content, LANGUAGES, examples=2, meanings=2), repeat, number=20)
+    return results
+
+def bench_tagging(repeat, words=2000) -> dict:
+    # spaCy throughput without the tag memo, skipped when the model is not installed
+    try:
+        Vocabulary.get_nlp()
+    except (ImportError, OSError) as e:
+        return {"tagging": {"skipped": str(e)}}
+    tag_cache, Vocabulary.tag_cache = Vocabulary.tag_cache, None
+    sample = [row["german"] for row in synthetic_rows(words, seed=2)]
+    try:
+        results = {"tagging.tag_words": timed(lambda: Vocabulary.tag_words(sample), repeat)}
+        clean = Vocabulary()
+        def clean_data():
+            clean.data = pd.DataFrame({"Input": sample})
+            clean.clean_data()
+        results["tagging.clean_data"] = timed(clean_data, repeat)
+    finally:
+        Vocabulary.tag_cache = tag_cache
+    for name in results:
+        results[name]["words_per_second"] = words / results[name]["median"]
+    return results
+
+def bench_render(path, repeat) -> dict:
+    # VirtualTable page loads into a real Treeview, needs a display
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        return {"render": {"skipped": str(e)}}
+    from main import VirtualTable
+    root.withdraw()
+    db = DBManager(path)
+    columns = ["type", "german", "translation", "second_translation", "meaning", "score"]
+    table = ttk.Treeview(root, columns=columns, show="headings")
+    scrollbar = ttk.Scrollbar(root, command=table.yview)
+    virtual = VirtualTable(table, db, scrollbar)
+    results = {}
+    for mode in ("all", "duplicates", "nouns"):
+        def render():
+            virtual.load(mode)
+            root.update_idletasks()
+        results[f"render.display_vocabulary.{mode}"] = timed(render, repeat)
+    def scroll():
+        virtual.load_next()
+        root.update_idletasks()
+    virtual.load("all")
+    results["render.next_page"] = timed(scroll, repeat, number=10)
+    root.destroy()
+    db.close()
+    return results
+
+# MARK: Reporting
+def compare(results, baseline, tolerance) -> list:
+    # names whose median got slower than tolerance x the baseline
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline ms':>14}{'now ms':>12}{'ratio':>8}")
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name, {})
+        if "median" not in result or "median" not in old: continue
+        ratio = result["median"] / old["median"] if old["median"] else float("inf")
+        flag = "  slower" if ratio > tolerance else ""
+        if flag: regressions.append(name)
+        print(f"{name:<40}{old['median'] * 1000:>14.3f}{result['median'] * 1000:>12.3f}{ratio:>7.2f}x{flag}")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=HERE).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="10k", choices=list(SIZES), help="size of the synthetic vocabulary")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", default=["db", "writes", "parse", "tagging", "render"])
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare with a saved results file")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slow-down ratio reported as regression")
+    args = parser.parse_args()
+
+    rows = SIZES[args.rows]
+    start = time.perf_counter()
+    path = synthetic_db(rows, args.seed)
+    print(f"synthetic vocabulary: {rows} rows ({time.perf_counter() - start:.1f} s) at {path}")
+
+    results = {}
+    if "db" in args.only: results.update(bench_db(path, args.repeat))
+    if "writes" in args.only: results.update(bench_writes(path, args.repeat))
+    if "parse" in args.only: results.update(bench_parse(args.repeat))
+    if "tagging" in args.only: results.update(bench_tagging(args.repeat))
+    if "render" in args.only: results.update(bench_render(path, args.repeat))
+
+    for name, result in results.items():
+        value = f"{result['median'] * 1000:10.3f} ms" if "median" in result else f"skipped: {result['skipped']}"
+        print(f"{name:<40}{value}")
+
+    report = {
+        "meta": {"rows": rows, "seed": args.seed, "repeat": args.repeat, "commit": git_commit(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "sqlite": sqlite3.sqlite_version, "platform": platform.platform(), "html_parser": HTML_PARSER},
+        "results": results,
+    }
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=4))
+        print(f"\nresults saved to {args.save}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("meta", {}).get("rows") != rows:
+            print(f"\nnote: baseline was measured on {baseline.get('meta', {}).get('rows')} rows")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
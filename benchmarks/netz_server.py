@@ -0,0 +1,198 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modules.vocabulary import Vocabulary, Netzverb
+
+""" Offline stand-in for verben.de: serves the recorded fixture pages at the paths of Netzverb.base_url,
+    noun_url and conj_url, with configurable latency, server errors and 429 throttling.
+    run with: python benchmarks/netz_server.py [--port 8765] [--latency 150] [--error-rate 0.02] [--max-rps 20]
+    and point the app or a headless worker at it: NETZVERB_HOST=http://127.0.0.1:8765 python main.py
+    or load-test the fetch stage against it: python benchmarks/netz_server.py --load 500 --workers 8 --rps 0
+    Latency, errors and throttles are drawn per (seed, url, attempt), so a run does the same whatever the thread timing."""
+
+FIXTURES = Path(__file__).parent / "fixtures"
+# request path -> fixture kind, the paths are the ones of the real site
+PATHS = {urlsplit(Netzverb.base_url).path: "verb", urlsplit(Netzverb.noun_url).path: "noun",
+         urlsplit(Netzverb.conj_url).path: "conj"}
+
+def load_pages() -> dict:
+    # kind -> {word: page}, fixtures are named <kind>_<word>.html
+    pages = {}
+    for path in sorted(FIXTURES.glob("*.html")):
+        kind, _, word = path.stem.partition("_")
+        pages.setdefault(kind, {})[word] = path.read_bytes()
+    return pages
+
+class NetzServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, max_rps=0.0,
+                 retry_after=1, missing_rate=0.0, seed=0):
+        super().__init__(address, NetzHandler)
+        self.pages = load_pages()
+        self.latency = latency           # seconds before every response
+        self.jitter = jitter             # mean extra seconds, exponential so there is a tail
+        self.error_rate = error_rate     # share of 503 responses
+        self.throttle_rate = throttle_rate # share of 429 responses
+        self.max_rps = max_rps           # 429 above this many requests per second, 0 = no limit
+        self.retry_after = retry_after   # seconds, sent with every 429
+        self.missing_rate = missing_rate # share of unknown words served the "Keine Treffer" page
+        self.seed = seed
+        self.attempts = Counter() # url -> requests so far
+        self.statuses = Counter()
+        self.lock = threading.Lock()
+        self.tokens = max_rps
+        self.updated = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def allow(self) -> bool:
+        # token bucket for --max-rps, one second of burst
+        if not self.max_rps: return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.max_rps, self.tokens + (now - self.updated) * self.max_rps)
+            self.updated = now
+            if self.tokens < 1: return False
+            self.tokens -= 1
+            return True
+
+    def respond(self, path, query) -> tuple:
+        # (status, headers, body) for one request
+        kind = PATHS.get(path)
+        word = unquote(query.get("w", [""])[0])
+        if kind is None or not word: return 404, {}, b"not found"
+        with self.lock:
+            attempt = self.attempts[(path, word)]
+            self.attempts[(path, word)] += 1
+        rnd = random.Random(f"{self.seed}:{path}:{word}:{attempt}")
+        time.sleep(self.latency + (rnd.expovariate(1 / self.jitter) if self.jitter else 0))
+        if not self.allow() or rnd.random() < self.throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}, b"too many requests"
+        if rnd.random() < self.error_rate: return 503, {}, b"service unavailable"
+
+        pages = self.pages.get(kind, {})
+        missing = self.pages.get("missing", {})
+        if word.lower() in pages: return 200, {}, pages[word.lower()]
+        if word.lower() in missing or not pages or random.Random(f"{self.seed}:{word}").random() < self.missing_rate:
+            return 200, {}, next(iter(missing.values()), b"<html></html>")
+        return 200, {}, next(iter(pages.values())) # any other word gets the recorded page of its kind
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": sum(self.statuses.values()), "statuses": dict(self.statuses)}
+
+class NetzHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like the real site
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/_stats":
+            status, headers, body = 200, {"Content-Type": "application/json"}, json.dumps(self.server.stats()).encode()
+        else:
+            status, headers, body = self.server.respond(url.path, parse_qs(url.query))
+            headers.setdefault("Content-Type", "text/html; charset=utf-8")
+            with self.server.lock: self.server.statuses[status] += 1
+        self.send_response(status)
+        for key, value in headers.items(): self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # one line per request would be the bottleneck
+
+# MARK: Load test
+def load_test(server, words, main_lang="en", second_lang="uk", examples=1, meanings=1) -> dict:
+    # the fetch stage of ImportPipeline (Vocabulary.enrich on Netzverb.workers threads) against the stand-in
+    Netzverb.set_host(server.url)
+    Netzverb.cache = None
+    Netzverb.latencies.clear()
+    types = ["der", "VERB", "SCONJ", "die", "ADJ"]
+    rows = [{"type": types[i % len(types)], "german": f"wort{i}", "translation": None, "second_translation": None,
+             "example": None, "meaning": None, "score": 0} for i in range(words)]
+    finished = []
+
+    def enrich(row):
+        row = Vocabulary.enrich(row, main_lang, second_lang, examples, meanings)
+        finished.append(time.perf_counter())
+        return row
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=max(1, Netzverb.workers)) as executor:
+        rows = list(executor.map(enrich, rows))
+    elapsed = time.perf_counter() - start
+    word_times = sorted(end - start for end in finished)
+    return {
+        "words": words,
+        "seconds": elapsed,
+        "words_per_second": words / elapsed if elapsed else 0,
+        "translated": sum(row["translation"] is not None for row in rows),
+        "p95_completion": word_times[int(0.95 * (len(word_times) - 1))] if word_times else None,
+        "requests": Netzverb.latency_stats(),
+        "server": server.stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=150, help="ms before every response")
+    parser.add_argument("--jitter", type=float, default=50, help="mean extra ms, exponentially distributed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="429 above this request rate, 0 = no limit")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="share of words without a page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--load", type=int, metavar="WORDS", help="run a load test with this many words and exit")
+    parser.add_argument("--workers", type=int, help="Netzverb workers for the load test")
+    parser.add_argument("--rps", type=float, help="client rate limit for the load test, 0 = no limit")
+    parser.add_argument("--backoff", type=float, help="client retry backoff seconds for the load test")
+    parser.add_argument("--save", type=Path, help="write the load test results to this JSON file")
+    args = parser.parse_args()
+
+    server = NetzServer((args.host, args.port), args.latency / 1000, args.jitter / 1000, args.error_rate,
+                        args.throttle_rate, args.max_rps, args.retry_after, args.missing_rate, args.seed)
+    if args.load is None:
+        print(f"serving {FIXTURES} at {server.url}, point Netzverb at it with NETZVERB_HOST={server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n{server.stats()}")
+        return
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    options = {"workers": args.workers, "requests_per_second": 1e9 if args.rps == 0 else args.rps, "backoff": args.backoff}
+    Netzverb.configure(**{key: value for key, value in options.items() if value is not None})
+    results = load_test(server, args.load)
+    server.shutdown()
+
+    requests = results["requests"]
+    print(f"{results['words']} words in {results['seconds']:.2f} s: {results['words_per_second']:.1f} words/s, "
+          f"{results['translated']} translated, workers {Netzverb.workers}")
+    if requests["requests"]:
+        print(f"request latency ms  p50 {requests['p50'] * 1000:.1f}  p95 {requests['p95'] * 1000:.1f}  "
+              f"max {requests['max'] * 1000:.1f}")
+    print(f"server: {results['server']}")
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({"options": vars(args) | {"save": str(args.save)}, "results": results}, indent=4))
+
+if __name__ == "__main__":
+    main()
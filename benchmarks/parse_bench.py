@@ -0,0 +1,46 @@
+import sys
+import timeit
+from pathlib import Path
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modules.vocabulary import Netzverb, HTML_PARSER
+
+""" Micro-benchmark: per-field BeautifulSoup scans vs. Netzverb.parse_page
+    run with: python benchmarks/parse_bench.py [repeats]"""
+
+FIXTURES = Path(__file__).parent / "fixtures"
+LANGUAGES = ("en", "uk")
+
+def legacy_parse(content):
+    soup = BeautifulSoup(content, "html.parser")
+    if not Netzverb.check_netz_presence(soup, None): return None
+    return {
+        "word": Netzverb.get_word(soup),
+        "verb": Netzverb.check_verb(soup),
+        "translations": {lang: Netzverb.get_translation(soup, lang) for lang in LANGUAGES},
+        "examples": Netzverb.get_example(soup, 2),
+        "meanings": Netzverb.get_meaning(soup, 2),
+    }
+
+def single_pass(content):
+    page = Netzverb.parse_page(content, LANGUAGES, examples=2, meanings=2)
+    return page if page["present"] else None
+
+def check_same(content):
+    old, new = legacy_parse(content), single_pass(content)
+    if old is None or new is None:
+        return old is None and new is None
+    return all(old[key] == new[key] for key in old)
+
+def main(repeats=50):
+    print(f"parser: {HTML_PARSER}, {repeats} repeats per page")
+    print(f"{'page':<16}{'legacy ms':>12}{'single ms':>12}{'speed-up':>10}  same")
+    for path in sorted(FIXTURES.glob("*.html")):
+        content = path.read_bytes()
+        legacy = timeit.timeit(lambda: legacy_parse(content), number=repeats) / repeats * 1000
+        single = timeit.timeit(lambda: single_pass(content), number=repeats) / repeats * 1000
+        print(f"{path.stem:<16}{legacy:>12.2f}{single:>12.2f}{legacy / single:>9.1f}x  {check_same(content)}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -1,16 +1,150 @@
+from __future__ import annotations
+import sys
+from modules.startup import LazyModule, StartupProfiler
+
+profiler = StartupProfiler() if "--profile-startup" in sys.argv else None
+if profiler: profiler.install()
+
 import tkinter as tk
 import customtkinter as ctk
 from tkinter import messagebox, filedialog, ttk
-import pandas as pd
 import threading
+import time
 import json
 from pathlib import Path
-from modules.DB_manager import DBManager
+from modules.DB_manager import DBManager, Changeset
+from modules import vocabulary
 from modules.vocabulary import Vocabulary, helper
+from modules.review_journal import ReviewJournal
+from modules.pipeline import ImportPipeline
+from modules.exporter import Exporter
+from modules.metrics import Progress
+
+pd = LazyModule("pandas")
 
 ctk.set_default_color_theme(Path(__file__).parent / "config/theme.json")  # Themes: "blue" (standard), "green", "dark-blue"
 ctk.set_appearance_mode("dark")
 
+class VirtualTable: # MARK: VirtualTable
+    """Shows a DB query in a Treeview a few pages at a time.
+    Rows are fetched with keyset pagination as the user scrolls, and rows far from the view are dropped."""
+    def __init__(self, table: ttk.Treeview, db: DBManager, scrollbar, page_size=200, max_pages=4):
+        self.table = table
+        self.db = db
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.mode = None # nothing loaded yet
+        self.order_by = "rowid"
+        self.descending = False
+        self.first_key = self.last_key = None
+        self.at_start = self.at_end = True
+        self.pending = False
+        self.row_filter = None # optional callable(rows of a page) -> rows to display, e.g. to overlay unsaved edits
+        self.rows = {} # iid -> row as fetched, the paging cursor needs exact DB values even if the row is gone since
+        self.table.configure(yscrollcommand=self.on_scroll)
+
+    def show(self, rows):
+        # fixed set of rows, e.g. search results: no paging until the next load()
+        self.mode = None
+        self.table.delete(*self.table.get_children())
+        self.rows.clear()
+        self.at_start = self.at_end = True
+        self.insert(rows)
+
+    def load(self, mode="all", order_by=None, descending=None, after=None):
+        self.mode = mode
+        if order_by is not None: self.order_by = order_by
+        if descending is not None: self.descending = descending
+        self.table.delete(*self.table.get_children())
+        self.rows.clear()
+        self.first_key = self.last_key = after
+        self.at_start = after is None
+        self.at_end = False
+        self.load_next()
+
+    def sort(self, column):
+        descending = not self.descending if column == self.order_by else False
+        self.load(self.mode or "all", order_by=column, descending=descending)
+
+    def values(self, row):
+        columns = ["rowid"] + self.db.columns
+        return [row[columns.index(name)] for name in self.table["columns"]]
+
+    def insert(self, rows, index=tk.END) -> int:
+        # insert the rows the row_filter keeps, returns how many were shown
+        rows = [row for row in rows if not self.table.exists(row[0])] # shown already, e.g. moved by an edit
+        self.rows.update((str(row[0]), row) for row in rows)
+        if self.row_filter: rows = self.row_filter(rows)
+        for shown, row in enumerate(rows):
+            self.table.insert("", index if index == tk.END else index + shown, iid=row[0], values=self.values(row))
+        return len(rows)
+
+    def load_next(self):
+        shown = 0
+        while not shown and not self.at_end: # pages where every row is hidden would stop the scrolling
+            rows = self.db.fetch_page(self.mode, self.page_size, self.order_by, self.descending, after=self.last_key)
+            if len(rows) < self.page_size: self.at_end = True
+            if not rows: return
+            if self.first_key is None or not self.table.get_children(): self.first_key = self.db.page_cursor(rows[0], self.order_by)
+            self.last_key = self.db.page_cursor(rows[-1], self.order_by)
+            shown = self.insert(rows)
+        self.trim(from_top=True)
+
+    def load_previous(self):
+        shown = 0
+        while not shown and not self.at_start:
+            rows = self.db.fetch_page(self.mode, self.page_size, self.order_by, self.descending, before=self.first_key)
+            if len(rows) < self.page_size: self.at_start = True
+            if not rows: return
+            self.first_key = self.db.page_cursor(rows[0], self.order_by)
+            shown = self.insert(rows, index=0)
+        self.trim(from_top=False)
+
+    def trim(self, from_top):
+        # drop a page at the far end once the window holds more than max_rows, keep the visible row in place
+        items = self.table.get_children()
+        extra = len(items) - self.max_rows
+        if extra <= 0: return
+        visible = items[min(len(items) - 1, int(self.table.yview()[0] * len(items)))]
+        dropped = items[:extra] if from_top else items[-extra:]
+        self.table.delete(*dropped)
+        for iid in dropped: self.rows.pop(iid, None)
+        items = self.table.get_children()
+        if from_top:
+            self.at_start = False
+            self.first_key = self.db.page_cursor(self.row(items[0]), self.order_by)
+        else:
+            self.at_end = False
+            self.last_key = self.db.page_cursor(self.row(items[-1]), self.order_by)
+        if self.table.exists(visible):
+            self.table.yview_moveto(self.table.index(visible) / len(items))
+
+    def row(self, iid):
+        # full (rowid, type, german, ...) row of a displayed item as it was fetched
+        return self.rows.get(iid) or self.db.fetch_row(int(iid))
+
+    def extend(self):
+        # show rows added since the last page was loaded (e.g. after an import)
+        if self.mode is not None and self.at_end:
+            self.at_end = False
+            self.load_next()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self.pending or self.mode is None: return
+        if float(last) > 0.9 and not self.at_end:
+            self.pending = True
+            self.table.after_idle(lambda: self.run_pending(self.load_next))
+        elif float(first) < 0.1 and not self.at_start:
+            self.pending = True
+            self.table.after_idle(lambda: self.run_pending(self.load_previous))
+
+    def run_pending(self, load):
+        try: load()
+        finally: self.pending = False
+
+
 class SettingWindow(ctk.CTkToplevel): # MARK: SettingWindow
     def __init__(self, master):
         # Create Window
@@ -160,13 +294,19 @@ class CardsWindow(ctk.CTkToplevel): # MARK: CardsWindow
         self.second_translation_var = ctk.Variable(value="Second translation")
         self.example_var = ctk.Variable(value="Example sentance")
         self.score_var = ctk.IntVar(value=-11)
+        self.shown_at = None # when the current card was shown, for answer latency
+
+        journal_settings = self.master.settings.get("reviews", {})
+        self.journal = ReviewJournal(self.master.db, flush_every=journal_settings.get("flush_every", 5))
+        self.flush_interval = int(float(journal_settings.get("flush_seconds", 10)) * 1000)
+        self.flush_job = self.after(self.flush_interval, self.flush_journal)
         
     def set_deck(self):
         flash_option = self.master.flash_mode.get()
-        sample_amount = lambda shape: min(int(self.master.cards_in_deck.get()), shape)
-        self.deck = self.master.db.to_dataframe(mode = flash_option) # get df with needed rows from db
-            
-        self.deck = self.deck.sample(sample_amount(self.deck.shape[0]), weights=self.deck.score.apply(lambda x: 4-x))
+        # due cards from the spaced repetition schedule, topped up with a few new words
+        self.deck = self.master.db.build_review_deck(mode = flash_option,
+            size = int(self.master.cards_in_deck.get()),
+            new_cards = int(self.master.settings.get("new_cards_in_deck", 10)))
     
     def flip(self):
         if self.front_side.winfo_ismapped():
@@ -226,7 +366,9 @@ class CardsWindow(ctk.CTkToplevel): # MARK: CardsWindow
 
     def next_card(self, points=0):
         if self.score_var.get() != -11: # set points for previous card
-            self.deck.loc[self.deck.query(f"german == '{self.card_data["german"]}'").index, "score"] = points
+            self.deck.at[self.card_data.name, "score"] = points
+            latency = time.perf_counter() - self.shown_at if self.shown_at else None
+            self.journal.add(self.card_data.name, points, latency)
         if self.current_card.get() == self.deck.shape[0]: 
             self.finish_layout()
             return
@@ -244,6 +386,12 @@ class CardsWindow(ctk.CTkToplevel): # MARK: CardsWindow
         self.second_translation_var.set(f"{self.card_data["second_translation"]}")
         self.example_var.set(f"{self.card_data["example"]}")
         self.score_var.set(f"{self.card_data["score"]}")
+        self.shown_at = time.perf_counter()
+
+    def flush_journal(self):
+        # periodic write-back, answers are also flushed every few cards and on close
+        self.journal.flush()
+        self.flush_job = self.after(self.flush_interval, self.flush_journal)
     
     def finish_layout(self): 
         self.cards_area.pack_forget()
@@ -258,10 +406,9 @@ class CardsWindow(ctk.CTkToplevel): # MARK: CardsWindow
         exit_button.place(relx=0.5, rely=0.85, anchor="center")
     
     def on_close(self):
-        # closes window and saves progress to db properly
-        self.deck.reset_index(inplace=True)
-        self.deck = self.deck[["rowid", "score"]]
-        self.master.db.update_from_df(self.deck)
+        # closes window and writes the remaining answers, scores follow from the journal
+        self.after_cancel(self.flush_job)
+        self.journal.flush()
         self.master.update_stats()
         self.destroy()
 
@@ -272,7 +419,7 @@ class EditableWindow(ctk.CTkToplevel): # MARK: EditableWindow
         self.master = master
         self.mode = mode
         # Check if there are any records to display
-        self.populate_records()
+        if not self.populate_records(): return
         width = 1200
         height = 500
         x = (self.winfo_screenwidth() - width) // 2
@@ -283,71 +430,72 @@ class EditableWindow(ctk.CTkToplevel): # MARK: EditableWindow
         self.protocol("WM_DELETE_WINDOW", func=self.on_close)
 
         self.edit_entry = None
-        self.updated_records = pd.DataFrame(columns=list(self.records.columns))
+        self.changes = Changeset() # only the edited cells and deleted rows are kept and written on save
             
         self.create_table()
         self.create_buttons()
+        if self.db_mode == "near_duplicates": self.find_similar()
 
-    def populate_records(self):
-        self.records = pd.DataFrame()
-
+    def populate_records(self) -> bool:
+        # rows are paged in by a VirtualTable, here we only check there is something to show
         if self.mode == "duplicates":
             self.title("Duplicate viewer")
-            self.records = self.master.db.to_dataframe(mode="duplicates")
+            # without exact duplicates the viewer starts with the similar words search
+            self.db_mode = "duplicates" if self.master.db.count_rows(mode="duplicates") else "near_duplicates"
             empty_string = "No duplicates found"
         elif self.mode == "edit":
             self.title("Edit mode")
-            self.records = self.master.db.to_dataframe(mode="all")
+            self.db_mode = "all"
             empty_string = "No records found"
         
-        if self.records.empty:
+        if not self.master.db.count_rows(mode="all" if self.db_mode == "near_duplicates" else self.db_mode):
             messagebox.showinfo("Info", empty_string)
             self.destroy()
-            return
+            return False
+        return True
 
     def create_table(self):
         self.cols = {
             "rowid" : 20, "type" : 50, "german" : 110, "translation": 200, 
             "second_translation": 200, "example" : 200, "meaning": 200, "score" : 25}
 
-        self.table = ttk.Treeview(self, columns=list(self.cols.keys()), show='headings', selectmode="extended")
+        table_frame = ctk.CTkFrame(self, fg_color="transparent")
+        table_frame.pack(expand=True, fill="both", padx=10)
+        self.table = ttk.Treeview(table_frame, columns=list(self.cols.keys()), show='headings', selectmode="extended")
+        scrollbar = ctk.CTkScrollbar(table_frame, width=15, orientation="vertical", command=self.table.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(expand=True, fill="both")
         
+        # sorting runs in SQLite, the table only holds the pages around the visible rows
+        self.virtual = VirtualTable(self.table, self.master.db, scrollbar)
+        self.virtual.row_filter = self.overlay
         for name in self.cols.keys():
-            self.table.heading(name, text=name, command=lambda c = name: sort_column(c, False))
+            self.table.heading(name, text=name, command=lambda c = name: self.virtual.sort(c))
             self.table.column(name, width=self.cols[name])
 
-        self.table.pack(expand=True, fill="both", padx=10)
-
         self.table.bind("<BackSpace>", lambda x: self.delete_selected_rows())
         self.table.bind("<Delete>", lambda x: self.delete_selected_rows())
         self.table.bind("<Double-1>", self.start_edit)
 
-        for row in self.records.itertuples(): # populate the table
-            self.table.insert("", "end", iid=row[0], values=list(row))
+        if self.db_mode != "near_duplicates": self.virtual.load(mode=self.db_mode)
 
-        def sort_column(col, reverse):
-            """Sort the Treeview column data."""
-            data = [(self.table.set(k, col), k) for k in self.table.get_children('')]
-            # Case-insensitive sorting
-            data.sort(key=lambda t: str(t[0]).lower(), reverse=reverse)
-            
-            for index, (val, k) in enumerate(data):
-                self.table.move(k, '', index)
-
-            # Reverse sorting on next click
-            self.table.heading(col, command=lambda: sort_column(col, not reverse))
+    def overlay(self, rows) -> list:
+        # show unsaved edits, hide rows that will be deleted, superseded rows are looked up once per page
+        superseded = self.master.db.superseded_rows([row[0] for row in rows]) if self.changes.keep_last else set()
+        shown = []
+        for row in rows:
+            rowid = row[0]
+            if rowid in self.changes.deletes or rowid in superseded: continue
+            cells = self.changes.updates.get(rowid)
+            shown.append((rowid, *[cells.get(column, value) for column, value in zip(self.master.db.columns, row[1:])])
+                         if cells else row)
+        return shown
 
     def delete_selected_rows(self): 
         selected_items = self.table.selection()  # Get selected rows
         for item in selected_items:
-            row_id = self.table.item(item)["values"][0]
-
-            updated_row = self.records.loc[row_id].copy()  # Get the row using the index (rowid)
-            updated_row["german"] = "#delete"
-            self.updated_records.loc[row_id] = updated_row  # Add the row to the updated DataFrame
-            
-            self.records.drop(row_id, inplace=True)  # Remove the row from the original DataFrame
-            self.table.delete(item)  # Delete each selected row
+            self.changes.delete(int(item))
+        self.table.delete(*selected_items)  # Delete each selected row
 
     def start_edit(self, event):
         # Identify the row and column being clicked
@@ -358,7 +506,8 @@ class EditableWindow(ctk.CTkToplevel): # MARK: EditableWindow
             columns = list(self.cols.keys())
             column_name = columns[int(column_id[1:]) - 1]
             if column_name == "rowid": return
-            current_value = self.records.at[int(row_id), column_name]
+            row = self.overlay([self.master.db.fetch_row(int(row_id))])[0]
+            current_value = row[self.master.db.columns.index(column_name) + 1]
 
             # Get the bounding box of the cell
             bbox = self.table.bbox(row_id, column_id)
@@ -366,23 +515,21 @@ class EditableWindow(ctk.CTkToplevel): # MARK: EditableWindow
                 # Create an Entry widget over the cell
                 self.edit_entry = ctk.CTkEntry(self, width=bbox[2], height=bbox[3], corner_radius=0)
                 self.edit_entry.place(x=bbox[0], y=bbox[1])
-                self.edit_entry.insert(0, current_value)  # Insert current value
+                self.edit_entry.insert(0, "" if current_value is None else current_value)  # Insert current value
                 self.edit_entry.focus()
 
                 # Bind events to save the value
-                self.edit_entry.bind("<Return>", lambda e: self.save_edit(row_id, column_name))
-                self.edit_entry.bind("<FocusOut>", lambda e: self.save_edit(row_id, column_name))
+                self.edit_entry.bind("<Return>", lambda e: self.save_edit(row_id, column_name, current_value))
+                self.edit_entry.bind("<FocusOut>", lambda e: self.save_edit(row_id, column_name, current_value))
 
-    # Function to save edited value to Treeview and DataFrame
-    def save_edit(self, row_id, column_name):
+    # Function to save edited value to Treeview and the changeset
+    def save_edit(self, row_id, column_name, current_value):
         if self.edit_entry:
             new_value = self.edit_entry.get()
-            # Update DataFrame
-            self.records.at[int(row_id), column_name] = new_value
-            updated_row = self.records.loc[int(row_id)].copy()
-            self.updated_records.loc[int(row_id)] = updated_row
-            # Update Treeview
-            self.table.set(row_id, column_name, new_value)
+            if new_value != ("" if current_value is None else str(current_value)):
+                self.changes.set(row_id, column_name, new_value)
+                # Update Treeview
+                self.table.set(row_id, column_name, new_value)
             # Remove Entry widget
             self.edit_entry.destroy()
             self.edit_entry = None
@@ -396,32 +543,44 @@ class EditableWindow(ctk.CTkToplevel): # MARK: EditableWindow
         ctk.CTkButton(buttons, text="Save changes",
                       command=self.save
                       ).pack(side="left", expand=True)
-        if self.mode == "duplicates" : ctk.CTkButton(buttons, text="Keep last instance",
-                      command=self.auto_delete
-                      ).pack(side="left", expand=True)
+        if self.mode == "duplicates" : 
+            self.keep_last_button = ctk.CTkButton(buttons, text="Keep last instance",
+                      command=self.auto_delete)
+            self.keep_last_button.pack(side="left", expand=True)
+            self.similar_button = ctk.CTkButton(buttons, text="Similar words",
+                      command=self.find_similar)
+            self.similar_button.pack(side="left", expand=True)
+
+    def find_similar(self):
+        # fuzzy grouping (spelling, article, typos) runs in a thread, it takes a few seconds on big tables
+        self.similar_button.configure(state="disabled", text="Searching...")
+        def detect():
+            count = self.master.db.find_near_duplicates()
+            self.after(0, lambda: self.show_similar(count))
+        threading.Thread(target=detect, daemon=True).start()
+
+    def show_similar(self, count):
+        if not self.winfo_exists(): return
+        self.similar_button.configure(state="normal", text="Similar words")
+        if not count:
+            messagebox.showinfo("Info", "No similar words found")
+            if self.db_mode == "near_duplicates": self.on_close() # there are no exact duplicates either
+            return
+        self.db_mode = "near_duplicates"
+        self.keep_last_button.configure(state="disabled") # only for exact duplicates
+        self.virtual.load(mode=self.db_mode, order_by="group", descending=False) # group by group
     
     def auto_delete(self):
-        # Identify duplicates (excluding the ones that are kept)
-        duplicates = self.records[self.records.duplicated(subset=["type", "german"], keep="last")]
-        # Remove duplicates from main dataframe
-        self.records = self.records.drop_duplicates(subset=["type", "german"], keep="last")
-        duplicates["german"] = "#delete"  # Mark duplicates for deletion
-        # Store deleted duplicates while preserving their indices
-        if hasattr(self, "updated_records"):  # If attribute exists, append to it
-            self.updated_records = pd.concat([self.updated_records, duplicates])
-        else: self.updated_records = duplicates.copy()
-
-        # Clear and populate the table
-        for item in self.table.get_children():
-            self.table.delete(item)
-        
-        for row in self.records.itertuples(): # populate the table
-            self.table.insert("", "end", iid=row[0], values=list(row))
+        # Deleting all but the last instance of each group is one statement on save,
+        # here only the rows shown right now are hidden
+        self.changes.keep_last = True
+        shown = [int(item) for item in self.table.get_children()]
+        hidden = self.master.db.superseded_rows(shown)
+        self.table.delete(*[item for item in self.table.get_children() if int(item) in hidden])
+        self.virtual.extend()
     
     def save(self):
-        self.updated_records.index.name = "rowid" # set index name to rowid
-        self.updated_records.reset_index(inplace=True)
-        self.master.db.update_from_df(self.updated_records)
+        self.master.db.apply_changeset(self.changes)
         self.on_close()
 
     def on_close(self):
@@ -429,8 +588,10 @@ class EditableWindow(ctk.CTkToplevel): # MARK: EditableWindow
         self.destroy()
 
 class MainApp(ctk.CTk): # MARK: MainApp
-    def __init__(self):
+    def __init__(self, profiler: StartupProfiler | None = None):
+        if profiler: profiler.mark("imports done")
         super().__init__()
+        self.profiler = profiler
         self.title("Vocabulary booster")
         width = 900
         height = 500
@@ -447,8 +608,22 @@ class MainApp(ctk.CTk): # MARK: MainApp
         self.create_layout()
         self.update_stats()
 
+        if self.profiler:
+            self.profiler.mark("main window created")
+            self.after_idle(self.finish_startup_profile)
+        else: # load spaCy & co. while the user looks around
+            self.after(200, lambda: threading.Thread(target=Vocabulary.warm_up, daemon=True).start())
+            self.after(500, self.resume_translation)
+
         self.mainloop()
 
+    def finish_startup_profile(self):
+        self.profiler.mark("interactive")
+        self.profiler.uninstall()
+        lazy_modules = [pd, vocabulary.requests, vocabulary.bs4, vocabulary.spacy]
+        print(self.profiler.report(lazy_modules))
+        self.destroy()
+
     def open_window(self, w_name):
         if self.windows[w_name] is None or not self.windows[w_name].winfo_exists():
             match w_name:
@@ -464,10 +639,13 @@ class MainApp(ctk.CTk): # MARK: MainApp
     def create_variables(self):
         # General variables
         self.db = DBManager() # db manager
-        self.input_data = Vocabulary() # df to store raw german words
+        self.input_file = None # csv file to import, read in chunks by the import pipeline
+        self.pipeline = None
+        self.exporting = False # an export has its own progress bar, one at a time
         self.in_file_var = ctk.Variable(value="")
         self.german_word = ctk.Variable(value="")
         self.flash_mode = ctk.Variable(value="all")
+        self.search_job = None # pending after() call of the search box
 
         # Windows and settings
         self.windows = {
@@ -487,6 +665,7 @@ class MainApp(ctk.CTk): # MARK: MainApp
         self.display_cols = self.settings.get("columns")
         self.flash_info = self.settings.get("flashcards")
         self.cards_in_deck = ctk.Variable(value=self.settings.get("cards_in_deck"))
+        vocabulary.apply_settings(self.settings)
 
         # Stats variables
         self.dup_number = ctk.Variable(value="")
@@ -503,7 +682,8 @@ class MainApp(ctk.CTk): # MARK: MainApp
         self.settings["cards_in_deck"] = self.cards_in_deck.get()
     
     def update_stats(self):
-        dn = self.db.count_rows(mode = "duplicates") # number of duplicates
+        stats = self.db.statistics() # all counters in one lookup
+        dn = stats.get("duplicates", 0) # number of duplicates
         if dn:
             self.dup_number.set(f"Duplicate values: {dn}")
             self.dup_values_stat.pack(side="left", padx=10)
@@ -512,7 +692,7 @@ class MainApp(ctk.CTk): # MARK: MainApp
             self.dup_number.set("")
             if self.dup_values_stat.winfo_ismapped(): self.dup_values_stat.pack_forget()
 
-        nn = self.db.count_rows(mode = "new") # number of new words
+        nn = stats.get("new", 0) # number of new words
         if nn:
             self.new_number.set(f"New words: {nn}")
             self.new_words_stat.pack(side="left", padx=10)
@@ -520,9 +700,12 @@ class MainApp(ctk.CTk): # MARK: MainApp
             self.new_number.set("")
             if self.new_words_stat.winfo_ismapped(): self.new_words_stat.pack_forget()
 
-    def update_progress(self, completed, total):
-        progress = completed / total
-        self.progress_var.set(progress)
+    def update_progress(self, completed, total, export=False):
+        # on the GUI thread, worker threads go through self.after
+        var, text, progress = ((self.export_var, self.export_text, self.export_progress) if export
+                               else (self.progress_var, self.progress_text, self.progress))
+        var.set(completed / total)
+        text.set(progress.update(completed, total)) # throughput and time left
 
     # MARK: Menu area
     def create_menu(self):
@@ -562,37 +745,50 @@ class MainApp(ctk.CTk): # MARK: MainApp
 
     def extract_df(self, mode="all"):  
         file_path = filedialog.asksaveasfilename(defaultextension=".csv",  
-        filetypes =[("CSV files", "*.csv"), ("Excel files", "*.xlsx"),  
-                    ("JSON files", "*.json"), ("Text files", "*.txt")])  
-        if file_path:  
-            try:  
-                data = self.db.to_dataframe(mode=mode)  
-                ext = file_path.split(".")[-1].lower()  # Extract file extension  
-
-                if ext == "csv": 
-                    data.to_csv(file_path, index=False)  
-                elif ext == "xlsx":  
-                    data.to_excel(file_path, index=False)  
-                elif ext == "json":
-                    data.to_json(file_path, orient="records", indent=4, force_ascii=False)  
-                elif ext == "txt": 
-                    data.to_csv(file_path, index=False, sep="\t", header=True, mode="w", encoding="utf-8")
-                else:  
-                    messagebox.showwarning("Warning", "Unsupported file format!")  
-                    return  
-                messagebox.showinfo("Success", f"Data saved to {file_path}")  
-            except Exception as e:  
-                messagebox.showerror("Error", f"Failed to save file: {e}")  
+        filetypes =[(name, f"*.{ext}") for ext, name in Exporter.formats.items()])  
+        if not file_path: return
+        if file_path.split(".")[-1].lower() not in Exporter.formats:  
+            messagebox.showwarning("Warning", "Unsupported file format!")  
+            return  
+        if self.exporting:
+            messagebox.showwarning("Warning", "Wait until the running export is finished.")
+            return
+
+        def on_progress(written, total):
+            self.after(0, lambda: self.update_progress(written, total, export=True))
+
+        def export():
+            # runs off the GUI thread, rows are written chunk by chunk
+            try:
+                Exporter(self.db, on_progress=on_progress).export(file_path, mode)
+                self.after(0, lambda: self.extract_complete(f"Data saved to {file_path}"))
+            except Exception as e:
+                self.after(0, lambda: self.extract_complete(f"Failed to save file: {e}", error=True))
+
+        self.exporting = True
+        self.export_var.set(0)
+        self.export_text.set("")
+        self.export_progress = Progress("rows")
+        self.export_bar.pack(pady=5)
+        self.export_label.pack()
+        threading.Thread(target=export, daemon=True).start()
+
+    def extract_complete(self, message, error=False):
+        self.exporting = False
+        self.export_bar.pack_forget()
+        self.export_label.pack_forget()
+        if error: messagebox.showerror("Error", message)
+        else: messagebox.showinfo("Success", message)  
 
     def load_csv_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv"), ("Text Files", "*.txt")])
         if file_path:
             try:
-                self.input_data.read_data(file_path)
-                self.input_data.clean_data()
+                words = ImportPipeline.count_words(file_path)
+                self.input_file = file_path
                 self.in_file_var.set(file_path.split("/")[-1])
                 self.translate_button.configure(state="normal")
-                messagebox.showinfo("Success", f"Data loaded successfully with {self.input_data.data.shape[0]} rows and {self.input_data.data.shape[1]} columns.")
+                messagebox.showinfo("Success", f"Data loaded successfully with {words} words.")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load file: {e}")
 
@@ -652,6 +848,15 @@ class MainApp(ctk.CTk): # MARK: MainApp
         self.progress_bar = ctk.CTkProgressBar(trl, height=25, mode="determinate", variable=self.progress_var)
         self.progress_bar["maximum"] = 1.0
         # self.progress_bar.pack(pady=10)
+        self.progress_text = ctk.Variable(value="")
+        self.progress_label = ctk.CTkLabel(trl, textvariable=self.progress_text)
+        self.progress = Progress()
+        # exports can run next to a translation, they get a bar of their own
+        self.export_var = ctk.Variable(value=0)
+        self.export_bar = ctk.CTkProgressBar(trl, height=25, mode="determinate", variable=self.export_var)
+        self.export_text = ctk.Variable(value="")
+        self.export_label = ctk.CTkLabel(trl, textvariable=self.export_text)
+        self.export_progress = Progress("rows")
 
         word_label = ctk.CTkLabel(translation_frame, text="Input word:")
         word_entry = ctk.CTkEntry(translation_frame, textvariable=self.german_word)
@@ -707,6 +912,10 @@ class MainApp(ctk.CTk): # MARK: MainApp
         ctk.CTkButton(tbs_frame, text="Edit mode",
                       command=lambda: self.open_window("edit_mode")
                       ).grid(row=3, column=1, padx=10,pady=5,sticky="e")      
+        # Row 4
+        self.search_entry = ctk.CTkEntry(tbs_frame, placeholder_text="Search")
+        self.search_entry.grid(row=4, column=0, padx=10, pady=5, sticky="ew", columnspan=2)
+        self.search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
 
     def create_table(self):
         col_names = []
@@ -757,7 +966,7 @@ class MainApp(ctk.CTk): # MARK: MainApp
             "example" : 200, "meaning": 200, "score" : 30
         }
         for name in col_names:
-            self.table.heading(name, text=name, command=lambda c = name: sort_column(c, False))
+            self.table.heading(name, text=name, command=lambda c = name: self.virtual.sort(c))
             self.table.column(name, width=widths[name])
 
         # Vertical Scrollbar
@@ -768,73 +977,102 @@ class MainApp(ctk.CTk): # MARK: MainApp
         self.h_scrollbar = ctk.CTkScrollbar(self.table_frame, height=15, orientation="horizontal", command=self.table.xview)
         self.h_scrollbar.place(relx=0.02, rely=0.96, relwidth=0.95)
 
-        # Link Treeview and Scrollbars
-        self.table.configure(yscrollcommand=self.v_scrollbar.set, xscrollcommand=self.h_scrollbar.set)
+        # Link Treeview and Scrollbars, VirtualTable pages rows in as the vertical scrollbar moves
+        self.table.configure(xscrollcommand=self.h_scrollbar.set)
         self.table.place(relx=0.02, rely=0.02, relwidth=0.95, relheight=0.94)
-        
-        def sort_column(col, reverse):
-            """Sort the Treeview column data."""
-            data = [(self.table.set(k, col), k) for k in self.table.get_children('')]
-            # Case-insensitive sorting
-            data.sort(key=lambda t: str(t[0]).lower(), reverse=reverse)
-            
-            for index, (val, k) in enumerate(data):
-                self.table.move(k, '', index)
 
-            # Reverse sorting on next click
-            self.table.heading(col, command=lambda: sort_column(col, not reverse))
+        previous = getattr(self, "virtual", None)
+        self.virtual = VirtualTable(self.table, self.db, self.v_scrollbar)
+        if previous and previous.mode: # columns changed, show the same rows again
+            self.virtual.load(previous.mode, previous.order_by, previous.descending)
     
     def translate(self, mode = None):
         if mode == "Translate one word":
-            self.input_data.data = pd.DataFrame({"Input":[self.german_word.get()]})
-            self.input_data.clean_data()
-
-        if  self.input_data.data.empty:
+            source = [self.german_word.get()]
+        else: source = self.input_file
+        if not source or not ImportPipeline.count_words(source):
             return
-        
-        def gui_callback():
-            self.after(0, lambda: self.translation_complete())
-        
+        # words are stored as jobs, then read, tagged, looked up and saved in overlapping stages, see ImportPipeline
+        self.run_pipeline(ImportPipeline(self.db,
+            self.main_lang_var.get(), 
+            self.sec_lang_var.get(),
+            self.example_var.get(),
+            self.meaning_var.get(), 
+            **self.pipeline_options()), source)
+
+    def resume_translation(self):
+        # a translation that was interrupted (app closed or crashed) continues with the words that are left
+        runs = self.db.job_runs()
+        if not runs or self.pipeline: return
+        run = runs[0]
+        if messagebox.askyesno("Resume translation", 
+            f"The last translation stopped after {run["done"]} of {run["total"]} words.\n"
+            f"Continue with the remaining {run["total"] - run["done"]}?"):
+            self.run_pipeline(ImportPipeline.resume(self.db, run, **self.pipeline_options()))
+        else: self.db.finish_job_run(run["id"], status="cancelled")
+
+    def pipeline_options(self) -> dict:
+        def batch_saved(last_rowid, rows):
+            self.after(0, lambda: (self.add_to_table(last_rowid), self.update_stats()))
+
+        def gui_callback(pipeline):
+            self.after(0, lambda: self.translation_complete(pipeline))
+
+        def progress(completed, total):
+            self.after(0, lambda: self.update_progress(completed, total))
+
+        return dict(on_progress = progress, on_batch = batch_saved, on_done = gui_callback,
+                    **self.settings.get("import", {}))
+
+    def run_pipeline(self, pipeline, source = None):
         self.translate_button.pack_forget()
+        self.progress_var.set(0)
+        self.progress_text.set("")
+        self.progress = Progress()
         self.progress_bar.pack(pady=5)
-
-        threading.Thread(
-            target=self.input_data.get_netz_info,       # Function to execute in the thread
-            args=(self.main_lang_var.get(), 
-                  self.sec_lang_var.get(),
-                  self.example_var.get(),
-                  self.meaning_var.get(), 
-                  self.update_progress,
-                  gui_callback),                 # Arguments for the function
-            daemon=True                          # Make the thread a daemon thread
-        ).start() 
+        self.progress_label.pack()
+        self.pipeline = pipeline
+        pipeline.start(source)
         
-    def translation_complete(self):
+    def translation_complete(self, pipeline):
         self.progress_bar.pack_forget()
+        self.progress_label.pack_forget()
         self.translate_button.pack(pady=10)
+        self.pipeline = None
+        print(pipeline.metrics.report()) # where the time went, per stage
         
-        messagebox.showinfo("Success", 
+        if pipeline.error:
+            messagebox.showerror("Error", f"Translation stopped after {pipeline.saved} words: {pipeline.error}")
+        else: messagebox.showinfo("Success", 
             f"Translation completed!\n\
-            {self.input_data.data["translation"].notna().sum()} out of {self.input_data.data.shape[0]}")
-        
-        self.add_to_table(self.input_data.data)
-        self.db.insert_data(self.input_data.data)
-        self.input_data.data.drop(self.input_data.data.index, inplace=True)
+            {pipeline.translated} out of {pipeline.saved}\n\
+            {pipeline.skipped} known words skipped, {pipeline.copied} copied\n\
+            {pipeline.metrics.summary()["words_per_second"]:.1f} words/s")
         self.update_stats()
         
-    def add_to_table(self, df: pd.DataFrame):
-        for i in df[list(self.table["columns"])].itertuples(index=False):
-            self.table.insert(parent='', index=tk.END, values=i)
+    def add_to_table(self, last_rowid):
+        # show rows inserted after last_rowid
+        if self.virtual.mode is None: # nothing displayed yet, list just the new words
+            self.virtual.load("all", order_by="rowid", descending=False, after=(last_rowid,))
+        else: self.virtual.extend()
 
     def display_vocabulary(self, filter="all"):
-        for item in self.table.get_children(): # clear the table
-            self.table.delete(item)
-
-        data = self.db.to_dataframe(mode = filter)
-
-        for i in data[list(self.table["columns"])].itertuples(index=False):
-            self.table.insert(parent='', index=tk.END, values=i)
+        self.virtual.load(mode = filter)
+
+    def schedule_search(self):
+        # search as you type, but only once typing pauses
+        if self.search_job: self.after_cancel(self.search_job)
+        self.search_job = self.after(250, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        query = self.search_entry.get().strip()
+        if not query: 
+            self.display_vocabulary()
+            return
+        if len(query) < 2: return # one letter matches most of the table
+        self.virtual.show(self.db.search(query, limit=200))
 
 
 if __name__ == "__main__":
-    MainApp()
+    MainApp(profiler)
@@ -1,21 +1,137 @@
+from __future__ import annotations
 import sqlite3
-import pandas as pd
+import threading
+import math
+import re
+import time
 from pathlib import Path
+from modules.startup import LazyModule
+from modules.scheduler import Scheduler
+from modules import dedup
+
+pd = LazyModule("pandas") # only needed for DataFrame input/output
+
+# Counters of the stats table: name -> condition on a vocabulary row ({row} is new/old in triggers).
+# "duplicates" is kept separately from word_groups.
+STAT_COUNTERS = {
+    "total":      "1",
+    "new":        "{row}.score = 0",
+    "incomplete": "({row}.translation IS NULL OR {row}.second_translation IS NULL "
+                  "OR {row}.example IS NULL OR {row}.meaning IS NULL)",
+    "nouns":      "{row}.type IN ('NOUN', 'PROPN', 'der', 'die', 'das')",
+    "verbs":      "{row}.type IN ('VERB', 'AUX')",
+    "adjectives": "{row}.type IN ('ADJ', 'ADP', 'ADV')",
+    "other":      "{row}.type NOT IN ('NOUN', 'VERB', 'ADJ', 'PROPN', 'AUX', 'ADP', 'ADV', 'der', 'die', 'das')",
+}
+
+# Columns of the full-text index, searched in this order of importance (see DBManager.search)
+SEARCH_COLUMNS = "german, translation, second_translation, example, meaning"
+SEARCH_WEIGHTS = (10.0, 5.0, 5.0, 1.0, 2.0)
+
+# ASCII spellings of umlauts and ß, diacritics alone are already folded by the tokenizer
+UMLAUT_SPELLINGS = {"ae": "ä", "oe": "ö", "ue": "ü", "ss": "ß"}
+
+def _stats_delta(added: str | None = None, removed: str | None = None) -> str:
+    # UPDATE adding the counters of the `added` row and subtracting the ones of the `removed` row
+    cases = []
+    for name, condition in STAT_COUNTERS.items():
+        terms = []
+        if added: terms.append(f"({condition.format(row=added)})")
+        if removed: terms.append(f"- ({condition.format(row=removed)})")
+        cases.append(f"WHEN '{name}' THEN {' '.join(terms)}")
+    return f"UPDATE stats SET value = value + CASE name {' '.join(cases)} ELSE 0 END;"
+
+class Changeset:
+    """Pending edits of the vocabulary table: changed cells per rowid and deleted rowids."""
 
-class DBManager:
     def __init__(self):
-        self.path = Path(__file__).parent.parent / "db/vocabulary.db"
-        self.create_db()
+        self.updates = {}    # rowid -> {column: value}
+        self.deletes = set() # rowids
+        self.keep_last = False # delete all but the last row of each duplicate group
 
-    def create_db(self):
-        with sqlite3.connect(self.path) as connection:
-            pass
+    def set(self, rowid: int, column: str, value):
+        if column not in DBManager.columns: raise KeyError(f"Unknown column: {column}")
+        rowid = int(rowid)
+        if rowid not in self.deletes: self.updates.setdefault(rowid, {})[column] = value
 
-    def create_table(self):
-        with sqlite3.connect(self.path) as connection:
-            cursor = connection.cursor()
+    def delete(self, rowid: int):
+        rowid = int(rowid)
+        self.updates.pop(rowid, None)
+        self.deletes.add(rowid)
+
+    def get(self, rowid: int, column: str, default=None):
+        return self.updates.get(int(rowid), {}).get(column, default)
+
+    def groups(self) -> dict:
+        # rows with the same changed columns can share one UPDATE statement
+        groups = {}
+        for rowid, cells in self.updates.items():
+            groups.setdefault(tuple(sorted(cells)), []).append({"rowid": rowid, **cells})
+        return groups
+
+    def clear(self):
+        self.updates.clear()
+        self.deletes.clear()
+        self.keep_last = False
+
+    def __len__(self):
+        return sum(len(cells) for cells in self.updates.values()) + len(self.deletes) + self.keep_last
+
+
+class DBManager:
+    # connection tuning, applied to every new connection
+    pragmas = {
+        "journal_mode": "WAL",     # readers don't block the writer and vice versa
+        "synchronous": "NORMAL",   # safe with WAL, avoids an fsync per commit
+        "busy_timeout": 5000,      # ms to wait for a lock instead of failing with "database is locked"
+        "cache_size": -16000,      # negative value = KiB, so 16 MB page cache
+        "mmap_size": 268435456,    # 256 MB memory-mapped reads
+        "temp_store": "MEMORY",
+    }
+    cached_statements = 256
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path(__file__).parent.parent / "db/vocabulary.db"
+        self._local = threading.local()
+        self._connections = {} # thread id -> connection, so close() can reach all of them
+        self._connections_lock = threading.Lock()
+        self.create_db()
 
-            cursor.execute("""
+    def create_db(self):
+        self.migrate()
+
+    def connect(self) -> sqlite3.Connection:
+        # one long-lived connection per thread (GUI thread, translation thread, ...)
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.pragmas["busy_timeout"] / 1000,
+                                         cached_statements=self.cached_statements, check_same_thread=False)
+            for key, value in self.pragmas.items():
+                connection.execute(f"PRAGMA {key}={value};")
+            try: # SQLite builds without math functions get ln() from Python
+                connection.execute("SELECT ln(1);")
+            except sqlite3.OperationalError:
+                connection.create_function("ln", 1, math.log, deterministic=True)
+            self._local.connection = connection
+            with self._connections_lock:
+                alive = {thread.ident for thread in threading.enumerate()}
+                for ident in [ident for ident in self._connections if ident not in alive]:
+                    self._connections.pop(ident).close() # connections of finished threads
+                self._connections[threading.get_ident()] = connection
+        return connection
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # Schema versions: migration N brings the database to PRAGMA user_version N.
+    # Append new steps at the end, never edit ones that have shipped.
+    migrations = [
+        [ # 1: base table
+            """
             CREATE TABLE IF NOT EXISTS vocabulary (
                 type TEXT NOT NULL,
                 german TEXT NOT NULL,
@@ -24,12 +140,197 @@ class DBManager:
                 example TEXT,
                 meaning TEXT,
                 score INTEGER NOT NULL DEFAULT 0
-            ); """)
+            ); """,
+        ],
+        [ # 2: indexes for the duplicates, new-words and word type filters
+            "CREATE INDEX IF NOT EXISTS idx_vocabulary_type_german ON vocabulary(type, german);",
+            "CREATE INDEX IF NOT EXISTS idx_vocabulary_score ON vocabulary(score);",
+            "CREATE INDEX IF NOT EXISTS idx_vocabulary_german ON vocabulary(german);",
+        ],
+        [ # 3: (type, german) group sizes kept current by triggers, duplicates are groups with n > 1
+            """
+            CREATE TABLE IF NOT EXISTS word_groups (
+                type TEXT NOT NULL,
+                german TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (type, german)
+            ) WITHOUT ROWID; """,
+            "CREATE INDEX IF NOT EXISTS idx_word_groups_duplicates ON word_groups(n) WHERE n > 1;",
+            "DELETE FROM word_groups;",
+            "INSERT INTO word_groups (type, german, n) SELECT type, german, COUNT(*) FROM vocabulary GROUP BY type, german;",
+            """
+            CREATE TRIGGER IF NOT EXISTS word_groups_insert AFTER INSERT ON vocabulary BEGIN
+                INSERT INTO word_groups (type, german, n) VALUES (new.type, new.german, 1)
+                ON CONFLICT (type, german) DO UPDATE SET n = n + 1;
+            END; """,
+            """
+            CREATE TRIGGER IF NOT EXISTS word_groups_delete AFTER DELETE ON vocabulary BEGIN
+                UPDATE word_groups SET n = n - 1 WHERE type = old.type AND german = old.german;
+                DELETE FROM word_groups WHERE type = old.type AND german = old.german AND n <= 0;
+            END; """,
+            """
+            CREATE TRIGGER IF NOT EXISTS word_groups_update AFTER UPDATE OF type, german ON vocabulary
+            WHEN old.type IS NOT new.type OR old.german IS NOT new.german BEGIN
+                UPDATE word_groups SET n = n - 1 WHERE type = old.type AND german = old.german;
+                DELETE FROM word_groups WHERE type = old.type AND german = old.german AND n <= 0;
+                INSERT INTO word_groups (type, german, n) VALUES (new.type, new.german, 1)
+                ON CONFLICT (type, german) DO UPDATE SET n = n + 1;
+            END; """,
+        ],
+        [ # 4: statistics counters for the stats bar, kept current by triggers
+            """
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID; """,
+            "DELETE FROM stats;",
+            *[f"INSERT INTO stats (name, value) SELECT '{name}', IFNULL(SUM({condition.format(row='vocabulary')}), 0) FROM vocabulary;"
+              for name, condition in STAT_COUNTERS.items()],
+            "INSERT INTO stats (name, value) SELECT 'duplicates', IFNULL(SUM(n), 0) FROM word_groups WHERE n > 1;",
+            f"CREATE TRIGGER IF NOT EXISTS stats_insert AFTER INSERT ON vocabulary BEGIN {_stats_delta(added='new')} END;",
+            f"CREATE TRIGGER IF NOT EXISTS stats_delete AFTER DELETE ON vocabulary BEGIN {_stats_delta(removed='old')} END;",
+            f"CREATE TRIGGER IF NOT EXISTS stats_update AFTER UPDATE ON vocabulary BEGIN {_stats_delta(added='new', removed='old')} END;",
+            """
+            CREATE TRIGGER IF NOT EXISTS stats_groups_insert AFTER INSERT ON word_groups WHEN new.n > 1 BEGIN
+                UPDATE stats SET value = value + new.n WHERE name = 'duplicates';
+            END; """,
+            """
+            CREATE TRIGGER IF NOT EXISTS stats_groups_update AFTER UPDATE OF n ON word_groups BEGIN
+                UPDATE stats SET value = value
+                    + (CASE WHEN new.n > 1 THEN new.n ELSE 0 END)
+                    - (CASE WHEN old.n > 1 THEN old.n ELSE 0 END)
+                WHERE name = 'duplicates';
+            END; """,
+            """
+            CREATE TRIGGER IF NOT EXISTS stats_groups_delete AFTER DELETE ON word_groups WHEN old.n > 1 BEGIN
+                UPDATE stats SET value = value - old.n WHERE name = 'duplicates';
+            END; """,
+        ],
+        [ # 5: spaced repetition state per word, words without a row have never been reviewed
+            """
+            CREATE TABLE IF NOT EXISTS schedule (
+                word_id INTEGER PRIMARY KEY,
+                ease REAL NOT NULL,
+                interval REAL NOT NULL,
+                reps INTEGER NOT NULL,
+                due_at REAL NOT NULL
+            ); """,
+            "CREATE INDEX IF NOT EXISTS idx_schedule_due_at ON schedule(due_at);",
+            """
+            CREATE TRIGGER IF NOT EXISTS schedule_delete AFTER DELETE ON vocabulary BEGIN
+                DELETE FROM schedule WHERE word_id = old.rowid;
+            END; """,
+        ],
+        [ # 6: append-only journal of flash card answers, the score column follows the latest answer
+            """
+            CREATE TABLE IF NOT EXISTS reviews (
+                id INTEGER PRIMARY KEY,
+                word_id INTEGER NOT NULL,
+                reviewed_at REAL NOT NULL,
+                grade INTEGER NOT NULL,
+                latency REAL
+            ); """,
+            "CREATE INDEX IF NOT EXISTS idx_reviews_word ON reviews(word_id, reviewed_at);",
+            """
+            CREATE TRIGGER IF NOT EXISTS reviews_score AFTER INSERT ON reviews BEGIN
+                UPDATE vocabulary SET score = new.grade WHERE rowid = new.word_id AND score IS NOT new.grade;
+            END; """,
+            """
+            CREATE TRIGGER IF NOT EXISTS reviews_delete AFTER DELETE ON vocabulary BEGIN
+                DELETE FROM reviews WHERE word_id = old.rowid;
+            END; """,
+        ],
+        [ # 7: full-text index over the text columns, external content so the text is stored once
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS vocabulary_fts USING fts5(
+                {SEARCH_COLUMNS}, content='vocabulary', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            ); """,
+            "INSERT INTO vocabulary_fts(vocabulary_fts) VALUES ('rebuild');",
+            f"""
+            CREATE TRIGGER IF NOT EXISTS vocabulary_fts_insert AFTER INSERT ON vocabulary BEGIN
+                INSERT INTO vocabulary_fts (rowid, {SEARCH_COLUMNS})
+                VALUES (new.rowid, {', '.join(f'new.{column}' for column in SEARCH_COLUMNS.split(', '))});
+            END; """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS vocabulary_fts_delete AFTER DELETE ON vocabulary BEGIN
+                INSERT INTO vocabulary_fts (vocabulary_fts, rowid, {SEARCH_COLUMNS})
+                VALUES ('delete', old.rowid, {', '.join(f'old.{column}' for column in SEARCH_COLUMNS.split(', '))});
+            END; """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS vocabulary_fts_update AFTER UPDATE OF {SEARCH_COLUMNS} ON vocabulary BEGIN
+                INSERT INTO vocabulary_fts (vocabulary_fts, rowid, {SEARCH_COLUMNS})
+                VALUES ('delete', old.rowid, {', '.join(f'old.{column}' for column in SEARCH_COLUMNS.split(', '))});
+                INSERT INTO vocabulary_fts (rowid, {SEARCH_COLUMNS})
+                VALUES (new.rowid, {', '.join(f'new.{column}' for column in SEARCH_COLUMNS.split(', '))});
+            END; """,
+        ],
+        [ # 8: last result of the near-duplicate detector (see find_near_duplicates)
+            """
+            CREATE TABLE IF NOT EXISTS near_duplicates (
+                word_id INTEGER PRIMARY KEY,
+                group_id INTEGER NOT NULL
+            ); """,
+            "CREATE INDEX IF NOT EXISTS idx_near_duplicates_group ON near_duplicates(group_id);",
+            """
+            CREATE TRIGGER IF NOT EXISTS near_duplicates_delete AFTER DELETE ON vocabulary BEGIN
+                DELETE FROM near_duplicates WHERE word_id = old.rowid;
+            END; """,
+        ],
+        [ # 9: persisted translation runs, every input word is a job that workers claim with a lease
+            """
+            CREATE TABLE IF NOT EXISTS job_runs (
+                id INTEGER PRIMARY KEY,
+                source TEXT,
+                main_lang TEXT NOT NULL,
+                second_lang TEXT,
+                examples INTEGER NOT NULL DEFAULT 0,
+                meanings INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'running', -- running, done, cancelled
+                created_at REAL NOT NULL
+            ); """,
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                run_id INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending', -- pending, claimed, done
+                claimed_by TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                word_id INTEGER -- vocabulary row saved for this job
+            ); """,
+            "CREATE INDEX IF NOT EXISTS idx_jobs_run_status ON jobs(run_id, status, id);",
+        ],
+        [ # 10: words repeated within a run are found by word
+            "CREATE INDEX IF NOT EXISTS idx_jobs_run_word ON jobs(run_id, word);",
+        ],
+    ]
+
+    def schema_version(self) -> int:
+        return self.connect().execute("PRAGMA user_version;").fetchone()[0]
+
+    def migrate(self):
+        connection = self.connect()
+        while self.schema_version() < len(self.migrations):
+            connection.execute("BEGIN IMMEDIATE;") # another process may be migrating too
+            try:
+                version = self.schema_version()
+                if version < len(self.migrations):
+                    for step in self.migrations[version]:
+                        connection.execute(step)
+                    connection.execute(f"PRAGMA user_version={version + 1};")
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
 
-            connection.commit()
+    def create_table(self):
+        self.migrate()
 
     def insert_data(self, data: dict | list | pd.DataFrame): # ensure to always form dictionaries 
-        with sqlite3.connect(self.path) as connection:
+        with self.connect() as connection:
             cursor = connection.cursor()
 
             if isinstance(data, pd.DataFrame): 
@@ -58,7 +359,7 @@ class DBManager:
                 print("Error:", e)
 
     def update_data(self, data: dict | list | pd.DataFrame): # to bulk update, all columns should be same
-        with sqlite3.connect(self.path) as connection:
+        with self.connect() as connection:
             cursor = connection.cursor()
 
             if isinstance(data, pd.DataFrame):
@@ -86,7 +387,7 @@ class DBManager:
                 print("Error:", e)
             
     def delete_data(self, data: dict | list | pd.DataFrame):
-        with sqlite3.connect(self.path) as connection:
+        with self.connect() as connection:
             cursor = connection.cursor()
 
             delete_query = """
@@ -110,85 +411,418 @@ class DBManager:
                 print("Error:", e)
 
     def drop_table(self):
-        with sqlite3.connect(self.path) as connection:
+        with self.connect() as connection:
             cursor = connection.cursor()
 
             cursor.execute("DROP TABLE IF EXISTS vocabulary;")
 
             connection.commit()
         
+    columns = ["type", "german", "translation", "second_translation", "example", "meaning", "score"]
+
+    def mode_filter(self, mode: str = "all") -> str:
+        # WHERE condition on vocabulary for a filter mode
+        match mode:
+            case "duplicates": return "(type, german) IN (SELECT type, german FROM word_groups WHERE n > 1)"
+            case "near_duplicates": return "rowid IN (SELECT word_id FROM near_duplicates)"
+            case "new"       : return "score = 0"
+            case "nouns"     : return "type IN ('NOUN', 'PROPN', 'der', 'die', 'das')"
+            case "verbs"     : return "type IN ('VERB', 'AUX')"
+            case "adjectives": return "type IN ('ADJ', 'ADP', 'ADV')"
+            case "other"     : return "type NOT IN ('NOUN', 'VERB', 'ADJ', 'PROPN', 'AUX', 'ADP', 'ADV', 'der', 'die', 'das')"
+            case _           : return "1" # all
+
     def fetch_data(self, mode: str = "all", just_return_query: bool = False) -> list | str:
         # return either a list of tuples or a query string
-        with sqlite3.connect(self.path) as connection:
+        select_query = f"SELECT rowid, * FROM vocabulary WHERE {self.mode_filter(mode)} ORDER BY rowid;"
+        if just_return_query:
+            return select_query
+        with self.connect() as connection:
             cursor = connection.cursor()
+            cursor.execute(select_query)
+            return cursor.fetchall()
+
+    def sort_key(self, order_by: str) -> str:
+        # SQL expression rows are sorted by, NULLs become '' so keyset comparisons work
+        if order_by not in self.columns: return "rowid"
+        if order_by == "score": return "score"
+        return f"IFNULL({order_by}, '') COLLATE NOCASE"
+
+    def sort_keys(self, order_by: str) -> list:
+        # every expression of the ORDER BY, rowid last so the order is total
+        if order_by == "group": # near-duplicate groups, members next to each other (see fetch_page)
+            return ["group_id", self.sort_key("german"), "vocabulary.rowid"]
+        key = self.sort_key(order_by)
+        return ["rowid"] if key == "rowid" else [key, "rowid"]
+
+    def fetch_page(self, mode: str = "all", limit: int = 200, order_by: str = "rowid", descending: bool = False,
+                   after: tuple | None = None, before: tuple | None = None) -> list:
+        """Keyset pagination over fetch_data(mode) rows: (rowid, type, german, ...) tuples.
+        `after`/`before` are page_cursor() values of the last/first row already shown."""
+        keys = self.sort_keys(order_by)
+        source = "vocabulary"
+        conditions = [self.mode_filter(mode)]
+        if order_by == "group": # walks the group index, rows are only sorted within a group
+            source = "near_duplicates JOIN vocabulary ON vocabulary.rowid = near_duplicates.word_id"
+            if mode == "near_duplicates": conditions = ["1"] # the join keeps only grouped rows
+        backwards = before is not None
+        params = []
+        cursor_value = before if backwards else after
+        if cursor_value is not None:
+            greater = descending == backwards # direction of the next rows in sort order
+            conditions.append(f"({', '.join(keys)}) {'>' if greater else '<'} ({', '.join('?' * len(keys))})")
+            params.extend(cursor_value)
+        direction = "DESC" if descending != backwards else "ASC"
+        order = ", ".join(f"{part} {direction}" for part in keys)
+        query = f"SELECT vocabulary.rowid, vocabulary.* FROM {source} WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?;"
+        with self.connect() as connection:
+            rows = connection.execute(query, (*params, limit)).fetchall()
+        return rows[::-1] if backwards else rows
+
+    def superseded_rows(self, rowids: list) -> set:
+        # rowids that have a later row with the same type and german, "Keep last instance" deletes them
+        rowids = list(rowids)
+        superseded = set()
+        with self.connect() as connection:
+            for i in range(0, len(rowids), 500): # stay below SQLite's variable limit
+                chunk = rowids[i:i + 500]
+                superseded.update(rowid for rowid, in connection.execute(f"""
+                    SELECT rowid FROM vocabulary
+                    WHERE rowid IN ({', '.join('?' * len(chunk))})
+                    AND EXISTS (SELECT 1 FROM vocabulary AS later
+                        WHERE later.type = vocabulary.type AND later.german = vocabulary.german
+                        AND later.rowid > vocabulary.rowid); """, chunk))
+        return superseded
+
+    def find_near_duplicates(self, threshold: float = 0.8) -> int:
+        # group words that differ only in spelling, article or a typo, returns the number of rows in groups
+        with self.connect() as connection:
+            rows = connection.execute("SELECT rowid, type, german FROM vocabulary;")
+            groups = dedup.near_duplicate_groups(rows, threshold)
+            connection.execute("DELETE FROM near_duplicates;")
+            connection.executemany("INSERT INTO near_duplicates (word_id, group_id) VALUES (?, ?);",
+                                   ((rowid, group[0]) for group in groups for rowid in group))
+        return sum(len(group) for group in groups)
+
+    def match_query(self, text: str) -> str:
+        # user input -> FTS5 query: every word as a prefix, "strasse" also finds "Straße"
+        terms = []
+        for word in re.findall(r"\w+", text.casefold()):
+            spellings = {word}
+            for ascii, letter in UMLAUT_SPELLINGS.items():
+                spellings |= {spelling.replace(ascii, letter) for spelling in spellings}
+            terms.append("(" + " OR ".join(f'"{spelling}"*' for spelling in sorted(spellings)) + ")")
+        return " AND ".join(terms)
+
+    def search(self, query: str, limit: int = 100) -> list:
+        # ranked (rowid, type, german, ...) rows matching the query, best match first
+        match = self.match_query(query)
+        if not match: return []
+        with self.connect() as connection:
+            return connection.execute(f"""
+                SELECT vocabulary.rowid, vocabulary.* FROM vocabulary_fts
+                JOIN vocabulary ON vocabulary.rowid = vocabulary_fts.rowid
+                WHERE vocabulary_fts MATCH ?
+                ORDER BY bm25(vocabulary_fts, {', '.join(map(str, SEARCH_WEIGHTS))})
+                LIMIT ?; """, (match, limit)).fetchall()
+
+    def last_rowid(self) -> int:
+        with self.connect() as connection:
+            return connection.execute("SELECT IFNULL(MAX(rowid), 0) FROM vocabulary;").fetchone()[0]
+
+    def fetch_row(self, rowid: int) -> tuple | None:
+        with self.connect() as connection:
+            return connection.execute("SELECT rowid, * FROM vocabulary WHERE rowid = ?;", (rowid,)).fetchone()
+
+    def fetch_rows(self, rowids: list) -> dict:
+        # rowid -> (rowid, type, german, ...) for many rows at once
+        rowids = list(rowids)
+        rows = {}
+        with self.connect() as connection:
+            for i in range(0, len(rowids), 500): # stay below SQLite's variable limit
+                chunk = rowids[i:i + 500]
+                rows.update((row[0], row) for row in connection.execute(
+                    f"SELECT rowid, * FROM vocabulary WHERE rowid IN ({', '.join('?' * len(chunk))});", chunk))
+        return rows
+
+    def page_cursor(self, row: tuple, order_by: str = "rowid") -> tuple:
+        # keyset cursor of a fetch_page row for the given sort column
+        if order_by == "group":
+            with self.connect() as connection:
+                group_id = connection.execute("SELECT group_id FROM near_duplicates WHERE word_id = ?;", (row[0],)).fetchone()
+            return (group_id[0] if group_id else None, *self.page_cursor(row, "german"))
+        if self.sort_key(order_by) == "rowid": return (row[0],)
+        value = row[self.columns.index(order_by) + 1]
+        return (value if value is not None else "", row[0])
 
-            match mode:
-                case "duplicates": select_query = """
-                                    SELECT rowid, * FROM vocabulary
-                                    WHERE (type, german) IN (
-                                        SELECT type, german FROM vocabulary
-                                        GROUP BY type, german
-                                        HAVING COUNT(*) > 1
-                                    ); """
-                case "new"       : select_query = "SELECT rowid, * FROM vocabulary WHERE score = 0;"
-                case "nouns"     : select_query = "SELECT rowid, * FROM vocabulary WHERE type IN ('NOUN', 'PROPN', 'der', 'die', 'das');"
-                case "verbs"     : select_query = "SELECT rowid, * FROM vocabulary WHERE type IN ('VERB', 'AUX');"
-                case "adjectives": select_query = "SELECT rowid, * FROM vocabulary WHERE type IN ('ADJ', 'ADP', 'ADV');"
-                case "other"     : select_query = "SELECT rowid, * FROM vocabulary WHERE type NOT IN ('NOUN', 'VERB', 'ADJ', 'PROPN', 'AUX', 'ADP', 'ADV', 'der', 'die', 'das');"
-                case _           : select_query = "SELECT rowid, * FROM vocabulary;" # all
-
-            if just_return_query:
-                return select_query
-            else:
-                cursor.execute(select_query)
-                return cursor.fetchall()
-            
     def count_rows(self, mode: str = "all") -> int:
-        with sqlite3.connect(self.path) as connection:
-            cursor = connection.cursor()
-
-            match mode:
-                case "duplicates": count_query = """
-                                    SELECT COUNT(*) FROM vocabulary
-                                    WHERE (type, german) IN (
-                                        SELECT type, german FROM vocabulary
-                                        GROUP BY type, german
-                                        HAVING COUNT(*) > 1
-                                    ); """
-                case "nulls"     : count_query = """
-                                    SELECT COUNT(*) FROM vocabulary
-                                    WHERE translation IS NULL
-                                    OR second_translation IS NULL
-                                    OR example IS NULL
-                                    OR meaning IS NULL;
-                                    """
-                case "new"       : count_query = "SELECT COUNT(*) FROM vocabulary WHERE score = 0;"
-                case _           : count_query = "SELECT COUNT(*) FROM vocabulary;"
-
-            cursor.execute(count_query)
-            return cursor.fetchone()[0]
+        # counters come from the trigger-maintained stats table, see statistics()
+        match mode:
+            case "near_duplicates":
+                with self.connect() as connection:
+                    return connection.execute("SELECT COUNT(*) FROM near_duplicates;").fetchone()[0]
+            case "duplicates": name = "duplicates"
+            case "nulls"     : name = "incomplete"
+            case "new"       : name = "new"
+            case "nouns" | "verbs" | "adjectives" | "other": name = mode
+            case _           : name = "total"
+        return self.statistics()[name]
+
+    def statistics(self) -> dict:
+        # all stats bar counters at once: total, new, duplicates, incomplete and per word class
+        with self.connect() as connection:
+            return dict(connection.execute("SELECT name, value FROM stats;").fetchall())
+
+    def check_statistics(self, rebuild: bool = False) -> dict:
+        """Recount everything from the vocabulary table, returns {name: (stored, actual)} of wrong counters.
+        "word_groups" is (groups that differ from the vocabulary, 0) when the trigger-kept groups drifted.
+        With rebuild, the wrong groups and counters found are fixed."""
+        with self.connect() as connection:
+            columns = ", ".join(f"IFNULL(SUM({condition.format(row='vocabulary')}), 0)"
+                                for condition in STAT_COUNTERS.values())
+            actual = dict(zip(STAT_COUNTERS, connection.execute(f"SELECT {columns} FROM vocabulary;").fetchone()))
+            actual["duplicates"] = connection.execute("""
+                SELECT IFNULL(SUM(n), 0) FROM (
+                    SELECT COUNT(*) AS n FROM vocabulary GROUP BY type, german HAVING COUNT(*) > 1); """).fetchone()[0]
+            stored = dict(connection.execute("SELECT name, value FROM stats;").fetchall())
+            wrong = {name: (stored.get(name), value) for name, value in actual.items() if stored.get(name) != value}
+            drifted = connection.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT * FROM (SELECT type, german, COUNT(*) FROM vocabulary GROUP BY type, german
+                                   EXCEPT SELECT type, german, n FROM word_groups)
+                    UNION ALL
+                    SELECT * FROM (SELECT type, german, n FROM word_groups
+                                   EXCEPT SELECT type, german, COUNT(*) FROM vocabulary GROUP BY type, german)); """).fetchone()[0]
+            if drifted: wrong["word_groups"] = (drifted, 0)
+            if rebuild and drifted:
+                connection.execute("DELETE FROM word_groups;")
+                connection.execute("""
+                    INSERT INTO word_groups (type, german, n)
+                    SELECT type, german, COUNT(*) FROM vocabulary GROUP BY type, german; """)
+            if rebuild and wrong: # after the groups, their triggers change the duplicates counter
+                connection.executemany("INSERT OR REPLACE INTO stats (name, value) VALUES (?, ?);", actual.items())
+            return wrong
+
+    def query_plan(self, mode: str = "all") -> list:
+        # EXPLAIN QUERY PLAN of fetch_data(mode), to check which indexes a filter uses
+        query = self.fetch_data(mode, just_return_query=True)
+        with self.connect() as connection:
+            return [row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}")]
+
+    def iter_rows(self, mode: str = "all", chunk_size: int = 5000):
+        # fetch_data(mode) rows in lists of chunk_size, read from one cursor
+        with self.connect() as connection:
+            cursor = connection.execute(self.fetch_data(mode, just_return_query=True))
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
 
     def to_dataframe(self, mode: str = "all") -> pd.DataFrame:
         query = self.fetch_data(mode, just_return_query=True) # get query according to given mode
-        with sqlite3.connect(self.path) as connection:
+        with self.connect() as connection:
             # read the data into a DataFrame and make rowid the index
             return pd.read_sql_query(query, connection, index_col="rowid") 
         
-    def update_from_df(self, df: pd.DataFrame):
-        if "rowid" not in df.columns: # if rowid is not in the df, add it from index
-            df.reset_index(inplace=True)
-
-        self.update_data(df)
-
-        with sqlite3.connect(self.path) as connection:
-            cursor = connection.cursor()
-            query = """
-            DELETE FROM vocabulary WHERE german LIKE '#del%';
-            """
-            cursor.execute(query)
+    def build_deck(self, mode: str = "all", size: int = 20) -> pd.DataFrame:
+        """Weighted random sample of `size` words without replacement, drawn inside SQLite.
+        Weight is 4 - score, so words answered badly come up more often.
+        Each row gets the key -ln(u) / weight with u uniform in (0, 1]; the smallest keys win."""
+        query = f"""
+            SELECT rowid, * FROM vocabulary
+            WHERE {self.mode_filter(mode)}
+            ORDER BY -ln(0.5 - random() / 18446744073709551616.0) / MAX(4 - score, 1)
+            LIMIT ?; """
+        with self.connect() as connection:
+            return pd.read_sql_query(query, connection, params=(int(size),), index_col="rowid")
+
+    def build_review_deck(self, mode: str = "all", size: int = 20, new_cards: int = 10, now: float | None = None) -> pd.DataFrame:
+        """Deck for a spaced repetition session: due words first (oldest due first), then at most
+        `new_cards` never reviewed words, then the words that are due next."""
+        now = time.time() if now is None else now
+        scheduled_query = f"""
+            SELECT vocabulary.rowid, vocabulary.*, schedule.due_at FROM schedule
+            CROSS JOIN vocabulary ON vocabulary.rowid = schedule.word_id
+            WHERE {self.mode_filter(mode)}
+            ORDER BY schedule.due_at
+            LIMIT ?; """
+        new_query = f"""
+            SELECT rowid, * FROM vocabulary
+            WHERE {self.mode_filter(mode)}
+            AND NOT EXISTS (SELECT 1 FROM schedule WHERE word_id = vocabulary.rowid)
+            LIMIT ?; """
+        with self.connect() as connection:
+            scheduled = pd.read_sql_query(scheduled_query, connection, params=(int(size),), index_col="rowid")
+            due = scheduled[scheduled.due_at <= now]
+            new_limit = max(0, min(int(new_cards), int(size) - len(due)))
+            new = pd.read_sql_query(new_query, connection, params=(new_limit,), index_col="rowid")
+        upcoming = scheduled[scheduled.due_at > now].head(int(size) - len(due) - len(new))
+        return pd.concat([frame for frame in (due, new, upcoming) if not frame.empty] or [due])
+
+    def _schedule(self, connection, rowid: int, points: int, now: float | None = None) -> dict:
+        # run the scheduler for one answer and store the word's next due date
+        row = connection.execute("SELECT ease, interval, reps FROM schedule WHERE word_id = ?;", (rowid,)).fetchone()
+        state = dict(zip(("ease", "interval", "reps"), row)) if row else None
+        state = Scheduler.review(state, points, now)
+        connection.execute("""
+            INSERT OR REPLACE INTO schedule (word_id, ease, interval, reps, due_at)
+            VALUES (:word_id, :ease, :interval, :reps, :due_at); """, {"word_id": rowid, **state})
+        return state
+
+    def schedule_review(self, rowid: int, points: int, now: float | None = None) -> dict:
+        with self.connect() as connection:
+            return self._schedule(connection, rowid, points, now)
+
+    def record_reviews(self, events: list):
+        """events are (rowid, reviewed_at, grade, latency) tuples; they are journaled and
+        scheduled in one transaction, the reviews_score trigger updates the score column"""
+        if not events: return
+        with self.connect() as connection:
+            connection.executemany(
+                "INSERT INTO reviews (word_id, reviewed_at, grade, latency) VALUES (?, ?, ?, ?);", events)
+            for rowid, reviewed_at, grade, _ in events:
+                self._schedule(connection, rowid, grade, reviewed_at)
+
+    def create_job_run(self, words, source=None, main_lang="en", second_lang=None, examples=0, meanings=0) -> int:
+        # stores every input word as a pending job, words may be any iterable (read lazily)
+        with self.connect() as connection:
+            run_id = connection.execute("""
+                INSERT INTO job_runs (source, main_lang, second_lang, examples, meanings, created_at)
+                VALUES (?, ?, ?, ?, ?, ?); """,
+                (source, main_lang, second_lang, int(examples), int(meanings), time.time())).lastrowid
+            connection.executemany("INSERT INTO jobs (run_id, word) VALUES (?, ?);", ((run_id, str(word).strip()) for word in words))
+            connection.execute("UPDATE job_runs SET total = (SELECT COUNT(*) FROM jobs WHERE run_id = ?) WHERE id = ?;",
+                               (run_id, run_id))
+        return run_id
+
+    def job_runs(self, status: str = "running") -> list:
+        with self.connect() as connection:
+            cursor = connection.execute("""
+                SELECT job_runs.*, (SELECT COUNT(*) FROM jobs WHERE run_id = job_runs.id AND status = 'done') AS done
+                FROM job_runs WHERE status = ? ORDER BY id; """, (status,))
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor]
+
+    def claim_jobs(self, run_id: int, worker: str, limit: int = 64, lease: float = 300) -> list:
+        """Atomically hands up to `limit` (job id, word) pairs to one worker. Pending jobs and jobs of other
+        workers whose lease ran out can be claimed, so several processes can share a run without doing a word twice."""
+        now = time.time()
+        connection = self.connect()
+        connection.execute("BEGIN IMMEDIATE;") # one claimer at a time
+        try:
+            jobs = connection.execute("""
+                UPDATE jobs SET status = 'claimed', claimed_by = ?, lease_until = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM jobs WHERE run_id = ? AND status = 'pending'
+                    UNION ALL
+                    SELECT id FROM jobs WHERE run_id = ? AND status = 'claimed' AND lease_until < ? AND claimed_by != ?
+                    ORDER BY id LIMIT ?)
+                RETURNING id, word; """, (worker, now + lease, run_id, run_id, now, worker, limit)).fetchall()
             connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        return sorted(jobs)
+
+    def renew_jobs(self, worker: str, lease: float = 300) -> int:
+        # extends the lease of every job the worker still holds, so long runs keep their claims
+        with self.connect() as connection:
+            return connection.execute("""
+                UPDATE jobs SET lease_until = ? WHERE status = 'claimed' AND claimed_by = ?; """,
+                (time.time() + lease, worker)).rowcount
+
+    def complete_jobs(self, worker: str, rows: list) -> int:
+        """Checkpoint: saves the vocabulary rows of finished jobs and marks the jobs done in one transaction.
+        rows are vocabulary dicts with a "job" id; jobs this worker no longer holds are left out.
+        Rows flagged "skip" (word already saved) only close their job, pointing it at "word_id"."""
+        saved = 0
+        with self.connect() as connection:
+            for row in rows:
+                job = connection.execute("""
+                    UPDATE jobs SET status = 'done', lease_until = NULL, word_id = ?
+                    WHERE id = ? AND status = 'claimed' AND claimed_by = ?; """, (row.get("word_id"), row["job"], worker))
+                if not job.rowcount or row.get("skip"): continue
+                values = {column: row.get(column) for column in self.columns}
+                word_id = connection.execute(f"""
+                    INSERT INTO vocabulary ({", ".join(self.columns)})
+                    VALUES ({", ".join(f":{column}" for column in self.columns)}); """, values).lastrowid
+                connection.execute("UPDATE jobs SET word_id = ? WHERE id = ?;", (word_id, row["job"]))
+                saved += 1
+        return saved
+
+    def repeated_jobs(self, job_ids: list) -> set:
+        # jobs whose word already came earlier in the same run, only the first one is looked up
+        job_ids = list(job_ids)
+        repeated = set()
+        with self.connect() as connection:
+            for i in range(0, len(job_ids), 500):
+                chunk = job_ids[i:i + 500]
+                repeated.update(job_id for job_id, in connection.execute(f"""
+                    SELECT id FROM jobs AS job WHERE id IN ({', '.join('?' * len(chunk))}) AND EXISTS (
+                        SELECT 1 FROM jobs AS earlier
+                        WHERE earlier.run_id = job.run_id AND earlier.word = job.word AND earlier.id < job.id); """, chunk))
+        return repeated
+
+    def saved_words(self, keys) -> dict:
+        # (type, german) -> rowid of the newest saved row, for the keys that are in the vocabulary
+        saved = {}
+        with self.connect() as connection:
+            for word_type, german in set(keys):
+                row = connection.execute("""
+                    SELECT rowid FROM vocabulary WHERE type IS ? AND german = ? ORDER BY rowid DESC LIMIT 1; """,
+                    (word_type, german)).fetchone()
+                if row: saved[(word_type, german)] = row[0]
+        return saved
+
+    def jobs_left(self, run_id: int) -> int:
+        with self.connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM jobs WHERE run_id = ? AND status != 'done';",
+                                      (run_id,)).fetchone()[0]
+
+    def release_jobs(self, worker_alive) -> int:
+        # hand back jobs claimed by workers that are gone, worker_alive(worker id) -> bool
+        with self.connect() as connection:
+            workers = [worker for worker, in connection.execute(
+                "SELECT DISTINCT claimed_by FROM jobs WHERE status = 'claimed';")]
+            gone = [(worker,) for worker in workers if not worker_alive(worker)]
+            connection.executemany("""
+                UPDATE jobs SET status = 'pending', claimed_by = NULL, lease_until = NULL
+                WHERE status = 'claimed' AND claimed_by = ?; """, gone)
+        return len(gone)
+
+    def finish_job_run(self, run_id: int, status: str = "done"):
+        # done runs keep their jobs as a record of which word produced which row, cancelled ones are dropped
+        with self.connect() as connection:
+            connection.execute("UPDATE job_runs SET status = ? WHERE id = ?;", (status, run_id))
+            if status == "cancelled":
+                connection.execute("DELETE FROM jobs WHERE run_id = ? AND status != 'done';", (run_id,))
+
+    def apply_changeset(self, changeset: Changeset):
+        # one transaction, one executemany per set of changed columns, deletes by rowid
+        if not len(changeset): return
+        with self.connect() as connection:
+            if changeset.keep_last: # first, the duplicate viewer hid these rows before any edit
+                connection.execute(f"""
+                    DELETE FROM vocabulary WHERE {self.mode_filter("duplicates")}
+                    AND EXISTS (SELECT 1 FROM vocabulary AS later
+                        WHERE later.type = vocabulary.type AND later.german = vocabulary.german
+                        AND later.rowid > vocabulary.rowid); """)
+            for columns, rows in changeset.groups().items():
+                set_clause = ", ".join(f"{column}=:{column}" for column in columns)
+                connection.executemany(f"UPDATE vocabulary SET {set_clause} WHERE rowid=:rowid;", rows)
+            connection.executemany("DELETE FROM vocabulary WHERE rowid=?;", [(rowid,) for rowid in changeset.deletes])
 
-
+    def update_from_df(self, df: pd.DataFrame):
+        # rows whose german starts with "#del" are deleted, the other given columns are updated
+        if "rowid" not in df.columns: # if rowid is not in the df, add it from index
+            df = df.reset_index()
+        changeset = Changeset()
+        columns = [column for column in df.columns if column in self.columns]
+        for row in df.to_dict(orient="records"):
+            if str(row.get("german", "")).startswith("#del"):
+                changeset.delete(row["rowid"])
+                continue
+            for column in columns:
+                changeset.set(row["rowid"], column, row[column])
+        self.apply_changeset(changeset)
 
 
 def main(): 
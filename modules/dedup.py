@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+""" Near-duplicate detection for vocabulary rows.
+    Words are reduced to normalized keys (case, umlauts, ß, articles, spacing), rows with the same key are
+    duplicates, and keys one typo apart are near duplicates. Candidates come from a blocking index of
+    deletion variants (two keys one edit apart share a variant with at most one letter deleted),
+    so the edit distance is only computed inside these buckets instead of for every pair.
+    Every group is built around its first key and only takes keys similar to that one, so chains of
+    one-typo steps (Haus, Hals, Hall, Ball ...) do not merge into one huge group."""
+
+ARTICLES = {"der", "die", "das", "den", "dem", "des", "ein", "eine", "einen", "einem", "einer", "eines"}
+FOLDS = {"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"}
+WORD_CLASSES = {"der": "NOUN", "die": "NOUN", "das": "NOUN", "PROPN": "NOUN", "AUX": "VERB"}
+
+def word_class(word_type) -> str:
+    # nouns are stored with their article as type, a different article is still the same word
+    return WORD_CLASSES.get(word_type, word_type or "")
+
+def normalize(german) -> str:
+    words = re.sub(r"[^\w ]", " ", str(german or "").casefold()).split()
+    if len(words) > 1 and words[0] in ARTICLES: words = words[1:]
+    key = " ".join(words)
+    for letter, spelling in FOLDS.items():
+        key = key.replace(letter, spelling)
+    # other diacritics (é, ñ ...) are dropped
+    return "".join(char for char in unicodedata.normalize("NFKD", key) if not unicodedata.combining(char))
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def similarity(a: str, b: str) -> float:
+    return 1 - edit_distance(a, b) / max(len(a), len(b), 1)
+
+
+def deletions(key) -> set:
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+def candidate_pairs(keys: list, threshold=0.8) -> set:
+    """(i, j) index pairs of keys that are one edit apart or less.
+    Keys too short for one edit at the threshold are left out (checked against a one letter longer key)."""
+    index = defaultdict(list) # deletion variant -> key indexes
+    for i, key in enumerate(keys):
+        if (1 - threshold) * (len(key) + 1) < 1 - 1e-9: continue
+        for variant in deletions(key): index[variant].append(i)
+    pairs = set()
+    for bucket in index.values():
+        if len(bucket) < 2: continue
+        for a in range(len(bucket)):
+            for b in range(a + 1, len(bucket)): pairs.add((bucket[a], bucket[b]))
+    return pairs
+
+def near_duplicate_groups(rows, threshold=0.8) -> list:
+    """rows are (rowid, type, german); returns lists of rowids that are the same or nearly the same word."""
+    buckets = defaultdict(list) # (word class, normalized key) -> rowids
+    for rowid, word_type, german in rows:
+        key = normalize(german)
+        if key: buckets[(word_class(word_type), key)].append(rowid)
+
+    by_class = defaultdict(list)
+    for (cls, key), rowids in buckets.items():
+        by_class[cls].append((min(rowids), key, rowids))
+    groups = []
+    for entries in by_class.values(): # fuzzy matches only within a word class
+        entries.sort() # the oldest word of a group leads it
+        keys = [key for _, key, _ in entries]
+        similar = defaultdict(list)
+        for i, j in candidate_pairs(keys, threshold):
+            if similarity(keys[i], keys[j]) >= threshold:
+                similar[i].append(j)
+                similar[j].append(i)
+        grouped = set()
+        for i in range(len(entries)):
+            if i in grouped: continue
+            members = [i] + [j for j in sorted(similar[i]) if j not in grouped] # similar to the leader itself
+            grouped.update(members)
+            group = sorted(rowid for j in members for rowid in entries[j][2])
+            if len(group) > 1: groups.append(group)
+    return groups
@@ -0,0 +1,94 @@
+import csv
+import json
+import textwrap
+from importlib.util import find_spec
+from modules.startup import LazyModule
+
+# optional writers, the formats are only offered when the package is installed
+openpyxl = LazyModule("openpyxl")
+pa = LazyModule("pyarrow")
+pq = LazyModule("pyarrow.parquet")
+
+class Exporter:
+    """Writes the rows of a filter mode to a file while paging through a DB cursor,
+    so memory stays at one chunk whatever the size of the vocabulary."""
+    formats = {"csv": "CSV files", "txt": "Text files", "json": "JSON files"}
+    if find_spec("openpyxl"): formats["xlsx"] = "Excel files"
+    if find_spec("pyarrow"): formats.update(parquet="Parquet files", arrow="Arrow files", feather="Feather files")
+
+    def __init__(self, db, chunk_size=5000, on_progress=None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress # (rows written, total)
+        self.columns = db.columns
+
+    def export(self, path, mode="all") -> int:
+        ext = str(path).rsplit(".", 1)[-1].lower()
+        if ext not in self.formats: raise ValueError(f"Unsupported file format: .{ext}")
+        writer = getattr(self, f"write_{'arrow' if ext == 'feather' else ext}")
+        total = self.db.count_rows(mode)
+        written = 0
+
+        def chunks():
+            nonlocal written
+            for rows in self.db.iter_rows(mode, self.chunk_size):
+                rows = [row[1:] for row in rows] # without rowid
+                yield rows
+                written += len(rows)
+                if self.on_progress: self.on_progress(written, max(total, written))
+
+        writer(path, chunks())
+        return written
+
+    def records(self, rows):
+        return [dict(zip(self.columns, row)) for row in rows]
+
+    # Writers
+    def write_csv(self, path, chunks, delimiter=","):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file, delimiter=delimiter)
+            writer.writerow(self.columns)
+            for rows in chunks:
+                writer.writerows(rows)
+
+    def write_txt(self, path, chunks):
+        self.write_csv(path, chunks, delimiter="\t")
+
+    def write_json(self, path, chunks):
+        # a JSON array of records, written one record at a time
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("[")
+            first = True
+            for rows in chunks:
+                for record in self.records(rows):
+                    file.write(("\n" if first else ",\n") + textwrap.indent(json.dumps(record, indent=4, ensure_ascii=False), "    "))
+                    first = False
+            file.write("\n]\n")
+
+    def write_xlsx(self, path, chunks):
+        workbook = openpyxl.Workbook(write_only=True) # rows are streamed to the file
+        sheet = workbook.create_sheet("vocabulary")
+        sheet.append(self.columns)
+        for rows in chunks:
+            for row in rows: sheet.append(row)
+        workbook.save(path)
+
+    def arrow_schema(self):
+        return pa.schema([(column, pa.int64() if column == "score" else pa.string()) for column in self.columns])
+
+    def arrow_table(self, rows, schema):
+        return pa.Table.from_pylist(self.records(rows), schema=schema)
+
+    def write_parquet(self, path, chunks):
+        # one row group per chunk
+        schema = self.arrow_schema()
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in chunks:
+                writer.write_table(self.arrow_table(rows, schema))
+
+    def write_arrow(self, path, chunks):
+        # Arrow IPC file (Feather v2)
+        schema = self.arrow_schema()
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for rows in chunks:
+                writer.write_table(self.arrow_table(rows, schema))
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+class Metrics:
+    """Timers and counters for one import run: fetch, parse, tag and DB write times, cache hits and misses.
+    Set as Netzverb.metrics / Vocabulary.metrics by ImportPipeline, the classes skip the bookkeeping while it is None."""
+
+    def __init__(self, samples=10_000):
+        self.start = time.perf_counter()
+        self.timings = {} # name -> recent durations in seconds
+        self.totals = {}  # name -> (calls, seconds), over the whole run
+        self.samples = samples
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            if name not in self.timings: self.timings[name] = deque(maxlen=self.samples)
+            self.timings[name].append(seconds)
+            calls, total = self.totals.get(name, (0, 0.0))
+            self.totals[name] = (calls + 1, total + seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def hit_rate(self, name) -> float | None:
+        # share of <name>.hit among <name>.hit + <name>.miss
+        hits, misses = self.counters[f"{name}.hit"], self.counters[f"{name}.miss"]
+        return hits / (hits + misses) if hits + misses else None
+
+    @staticmethod
+    def percentile(values, q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+            totals = dict(self.totals)
+            counters = dict(self.counters)
+        stages = {}
+        for name, values in timings.items():
+            calls, total = totals[name]
+            stages[name] = {"calls": calls, "seconds": total, "mean": total / calls,
+                            "p50": self.percentile(values, 0.5), "p95": self.percentile(values, 0.95), "max": values[-1]}
+        caches = {name.rsplit(".", 1)[0] for name in counters if name.endswith((".hit", ".miss"))}
+        return {
+            "elapsed": elapsed,
+            "words_per_second": counters.get("words", 0) / elapsed if elapsed else 0.0,
+            "stages": stages,
+            "counters": counters,
+            "hit_rates": {name: self.hit_rate(name) for name in sorted(caches)},
+        }
+
+    def report(self) -> str:
+        summary = self.summary()
+        lines = [f"{summary['counters'].get('words', 0)} words in {summary['elapsed']:.1f} s "
+                 f"({summary['words_per_second']:.2f} words/s)",
+                 f"{'stage':<12}{'calls':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, stage in summary["stages"].items():
+            lines.append(f"{name:<12}{stage['calls']:>8}{stage['seconds']:>10.2f}{stage['p50'] * 1000:>10.1f}"
+                         f"{stage['p95'] * 1000:>10.1f}{stage['max'] * 1000:>10.1f}")
+        for name, rate in summary["hit_rates"].items():
+            lines.append(f"{name} hit rate: {rate:.0%}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=4)
+
+
+def timer(metrics, name):
+    # timer of metrics, or nothing when metrics are off
+    return metrics.timer(name) if metrics else nullcontext()
+
+
+class Progress:
+    """Throughput over the last `window` seconds and the time left at that rate, for progress bars."""
+
+    def __init__(self, unit="words", window=30.0):
+        self.unit = unit
+        self.window = window
+        self.samples = deque() # (time, completed)
+
+    def update(self, completed, total) -> str:
+        now = time.monotonic()
+        self.samples.append((now, completed))
+        while len(self.samples) > 2 and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+        text = f"{completed} / {total}"
+        first_time, first_done = self.samples[0]
+        seconds = now - first_time
+        if seconds <= 0 or completed <= first_done: return text
+        rate = (completed - first_done) / seconds
+        left = int((total - completed) / rate)
+        return f"{text}  ·  {rate:.1f} {self.unit}/s  ·  {left // 60}:{left % 60:02d} left"
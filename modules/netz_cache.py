@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+class NetzCache:
+    """SQLite cache of Netzverb pages keyed by URL, with TTL and LRU eviction.
+    Words without a Netzverb page are kept as negative entries (no content)."""
+
+    def __init__(self, path=None, ttl_days=30, negative_ttl_days=7, max_mb=200):
+        self.path = Path(path) if path else Path(__file__).parent.parent / "db/netz_cache.db"
+        self.ttl = float(ttl_days) * 86400
+        self.negative_ttl = float(negative_ttl_days) * 86400
+        self.max_size = int(float(max_mb) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.create_table()
+        self.total_size = self.connection.execute("SELECT IFNULL(SUM(size), 0) FROM pages;").fetchone()[0]
+
+    def create_table(self):
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL;")
+            self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content BLOB,
+                present INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL DEFAULT 0
+            ); """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed_at);")
+
+    def get(self, url) -> tuple | None:
+        # returns (html bytes or None, present) or None when the url is not cached / expired
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT content, present, fetched_at FROM pages WHERE url = ?;", (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            content, present, fetched_at = row
+            if now - fetched_at > (self.ttl if present else self.negative_ttl):
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?;", (now, url))
+            self.hits += 1
+        return (zlib.decompress(content) if content else None), bool(present)
+
+    def put(self, url, content: bytes | None, present: bool):
+        blob = zlib.compress(content) if present and content else None
+        size = len(blob) if blob else 0
+        now = time.time()
+        with self.lock:
+            old = self.connection.execute("SELECT size FROM pages WHERE url = ?;", (url,)).fetchone()
+            self.connection.execute("""
+                INSERT OR REPLACE INTO pages (url, content, present, fetched_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?); """, (url, blob, int(present), now, now, size))
+            self.total_size += size - (old[0] if old else 0)
+            if self.total_size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        # drop expired pages first, then least recently used ones until 10% below the cap
+        now = time.time()
+        self.connection.execute("BEGIN;")
+        self.connection.execute("""
+            DELETE FROM pages
+            WHERE (present = 1 AND fetched_at < ?) OR (present = 0 AND fetched_at < ?); """,
+            (now - self.ttl, now - self.negative_ttl))
+        target = self.max_size * 0.9
+        size = self.connection.execute("SELECT IFNULL(SUM(size), 0) FROM pages;").fetchone()[0]
+        cursor = self.connection.execute("SELECT url, size FROM pages ORDER BY accessed_at;")
+        stale = []
+        for url, page_size in cursor:
+            if size <= target: break
+            stale.append((url,))
+            size -= page_size
+        self.connection.executemany("DELETE FROM pages WHERE url = ?;", stale)
+        self.connection.execute("COMMIT;")
+        self.total_size = size
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM pages;")
+            self.total_size = 0
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class TagCache:
+    """Persistent word -> spaCy POS tag memo, stored next to the page cache."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path(__file__).parent.parent / "db/netz_cache.db"
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS pos_tags (
+                word TEXT PRIMARY KEY,
+                pos TEXT NOT NULL
+            ); """)
+
+    def get_many(self, words) -> dict:
+        words = list(words)
+        tags = {}
+        with self.lock:
+            for i in range(0, len(words), 500): # stay below SQLite's variable limit
+                chunk = words[i:i + 500]
+                query = f"SELECT word, pos FROM pos_tags WHERE word IN ({', '.join('?' * len(chunk))});"
+                tags.update(self.connection.execute(query, chunk).fetchall())
+        return tags
+
+    def put_many(self, tags: dict):
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO pos_tags (word, pos) VALUES (?, ?);", tags.items())
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
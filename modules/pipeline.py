@@ -0,0 +1,302 @@
+import csv
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from modules.vocabulary import Vocabulary, Netzverb, apply_settings
+from modules.metrics import Metrics
+
+class ImportPipeline:
+    """Streams words from a CSV file (or any iterable of words) into the database.
+
+    claim chunk -> split article + tag -> drop known words -> fetch + parse -> insert batch
+
+    The words of a run are first stored as jobs (see DBManager.create_job_run), workers claim chunks of
+    pending jobs and every saved batch marks its jobs done in the same transaction, so a run that was
+    interrupted resumes with the words that are left, also from several processes at once.
+    Every stage runs in its own thread and hands chunks to the next one through a bounded queue,
+    so the stages overlap and only a few chunks are held in memory whatever the size of the file.
+    Rows are committed in small batches and reported through on_batch as soon as they are saved.
+    Stage timings, counters and cache hit rates of a run are collected in self.metrics (see Metrics.report)."""
+    done = object() # end of stream marker passed down the queues
+    worker = f"{socket.gethostname()}:{os.getpid()}" # claims of this process
+
+    def __init__(self, db, main_lang, second_lang=None, examples=0, meanings=0,
+                 chunk_size=64, insert_batch=32, queue_size=4, lease=300, existing="skip", run_id=None,
+                 metrics_file=None, on_progress=None, on_batch=None, on_done=None):
+        self.db = db
+        self.run_id = run_id # continue this job run instead of starting a new one
+        self.lease = float(lease)
+        self.existing = existing # words already in the vocabulary: "skip", "copy" their saved row, or "fetch" again
+        self.main_lang, self.second_lang = Vocabulary.language_codes(main_lang, second_lang)
+        self.examples = int(examples)
+        self.meanings = int(meanings)
+        self.chunk_size = int(chunk_size)
+        self.insert_batch = int(insert_batch)
+        self.queue_size = int(queue_size)
+        self.on_progress = on_progress # (completed, total)
+        self.on_batch = on_batch       # (rowid before the batch, rows in the batch)
+        self.on_done = on_done         # (pipeline), see total / saved / translated / error
+
+        self.total = 0
+        self.completed = 0  # words looked up
+        self.saved = 0      # rows written to the database
+        self.translated = 0 # saved rows with a translation
+        self.skipped = 0    # words already in the vocabulary or repeated in the run
+        self.copied = 0     # words filled in from a saved row instead of Netzverb
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.error = None
+        self.stopped = threading.Event()
+        self.metrics = Metrics()
+        self.metrics_file = metrics_file # JSON dump of the metrics at the end of every run
+
+    @staticmethod
+    def read_words(source):
+        # first column of every non-empty line, the file is read line by line
+        if isinstance(source, (str, Path)):
+            with open(source, newline="", encoding="utf-8-sig") as file: # Excel adds a BOM
+                for line in csv.reader(file):
+                    if line and line[0].strip(): yield line[0]
+        else:
+            yield from (word for word in source if word and str(word).strip())
+
+    @classmethod
+    def count_words(self, source) -> int:
+        return sum(1 for _ in self.read_words(source))
+
+    def start(self, source, total=None) -> threading.Thread:
+        thread = threading.Thread(target=self.run, args=(source, total), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopped.set()
+
+    @classmethod
+    def resume(self, db, run: dict, **options):
+        # pipeline for an unfinished job run, run is a DBManager.job_runs() entry
+        return self(db, run["main_lang"], run["second_lang"], run["examples"], run["meanings"], run_id=run["id"], **options)
+
+    @staticmethod
+    def worker_alive(worker) -> bool:
+        # claims of dead processes on this machine can be released right away, others wait for their lease
+        host, _, pid = worker.rpartition(":")
+        if host != socket.gethostname(): return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, ValueError, OSError):
+            return True
+        return True
+
+    def run(self, source=None, total=None):
+        Netzverb.metrics = Vocabulary.metrics = self.metrics = Metrics()
+        if self.run_id is None:
+            self.run_id = self.db.create_job_run(self.read_words(source), str(source) if isinstance(source, (str, Path)) else None,
+                                                 self.main_lang, self.second_lang, self.examples, self.meanings)
+        else: self.db.release_jobs(self.worker_alive)
+        run = next((run for run in self.db.job_runs() if run["id"] == self.run_id), None)
+        if run is None: # finished or cancelled meanwhile
+            if self.on_done: self.on_done(self)
+            return
+        self.total = run["total"] if total is None else total
+        self.completed = run["done"]
+
+        claimed, typed, unique, enriched = (queue.Queue(self.queue_size) for _ in range(4))
+        stages = [
+            threading.Thread(target=self.stage, args=(self.claim, None, claimed), daemon=True),
+            threading.Thread(target=self.stage, args=(self.clean, claimed, typed), daemon=True),
+            threading.Thread(target=self.stage, args=(self.dedupe, typed, unique), daemon=True),
+            threading.Thread(target=self.stage, args=(self.fetch, unique, enriched), daemon=True),
+        ]
+        finished = threading.Event()
+        renew = threading.Thread(target=self.renew, args=(finished,), daemon=True)
+        for stage in stages + [renew]: stage.start()
+        try:
+            self.write(enriched)
+        except Exception as e:
+            self.fail(e)
+        for stage in stages: stage.join()
+        finished.set()
+        renew.join()
+        if self.error or self.stopped.is_set(): # unsaved words go back to the queue for the next run
+            self.db.release_jobs(lambda worker: worker != self.worker)
+        elif not self.db.jobs_left(self.run_id):
+            self.db.finish_job_run(self.run_id)
+        Netzverb.metrics = Vocabulary.metrics = None
+        if self.metrics_file: self.metrics.dump(self.metrics_file)
+        if self.on_done: self.on_done(self)
+
+    def stage(self, work, source, output):
+        try:
+            work(source, output)
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(output, self.done)
+
+    def fail(self, error):
+        if self.error is None: self.error = error
+        self.stopped.set()
+
+    def put(self, output, item):
+        # blocks while the next stage is busy, gives up once the pipeline is stopped
+        while True:
+            try:
+                output.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self.stopped.is_set(): return # the next stage does not read anymore
+
+    def chunks(self, source):
+        while not self.stopped.is_set():
+            try:
+                chunk = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if chunk is self.done: return
+            yield chunk
+
+    def renew(self, finished):
+        # claimed words can wait longer than the lease behind slow lookups, their leases are extended until the end
+        while not finished.wait(self.lease / 3):
+            try:
+                self.db.renew_jobs(self.worker, self.lease)
+            except Exception as e:
+                self.fail(e)
+                return
+
+    # Stages
+    def claim(self, source, output):
+        while not self.stopped.is_set():
+            if self.claimed_here() >= self.chunk_size * (self.queue_size + 1): # downstream is full
+                time.sleep(0.1)
+                continue
+            jobs = self.db.claim_jobs(self.run_id, self.worker, self.chunk_size, self.lease)
+            if jobs:
+                with self.lock: self.in_flight += len(jobs)
+                self.put(output, jobs)
+            elif self.db.jobs_left(self.run_id) > self.claimed_here(): # other workers hold the rest
+                time.sleep(1)
+            else: return
+
+    def claimed_here(self) -> int:
+        # jobs of this pipeline that are somewhere between claim and checkpoint
+        with self.lock:
+            return self.in_flight
+
+    def clean(self, source, output):
+        for chunk in self.chunks(source):
+            rows = []
+            for job, word in chunk:
+                word_type, german = Vocabulary.noun_type(word)
+                rows.append({"job": job, "type": word_type, "german": german, "translation": None,
+                             "second_translation": None, "example": None, "meaning": None, "score": 0})
+            untyped = [row["german"] for row in rows if row["type"] is None]
+            if untyped:
+                tags = Vocabulary.tag_words(untyped)
+                for row in rows:
+                    if row["type"] is None: row["type"] = tags.get(row["german"])
+            self.put(output, rows)
+
+    @staticmethod
+    def word_key(word_type, german) -> tuple:
+        # the exact (type, german) pair, "der Leiter" and "die Leiter" are different words
+        return word_type, str(german).strip()
+
+    @classmethod
+    def saved_rowid(self, row, saved: dict) -> int | None:
+        key = self.word_key(row["type"], row["german"])
+        if key in saved or row["type"] not in ("NOUN", "PROPN"): return saved.get(key)
+        # a tagged noun gets its article from the lookup, so it is the saved noun when only one article is saved
+        nouns = [saved[(article, key[1])] for article in ("der", "die", "das") if (article, key[1]) in saved]
+        return nouns[0] if len(nouns) == 1 else None
+
+    def dedupe(self, source, output):
+        # repeats within the run are dropped, saved words are skipped, copied or fetched again (self.existing)
+        # only the words of the chunk are looked up, so a run never holds the vocabulary in memory
+        for rows in self.chunks(source):
+            repeated = self.db.repeated_jobs(row["job"] for row in rows)
+            keys = {self.word_key(row["type"], row["german"]) for row in rows}
+            keys |= {(article, german) for word_type, german in keys if word_type in ("NOUN", "PROPN")
+                     for article in ("der", "die", "das")}
+            saved = self.db.saved_words(keys)
+            copies = {}
+            for row in rows:
+                rowid = None if row["job"] in repeated else self.saved_rowid(row, saved)
+                self.metrics.count("known_words.hit" if row["job"] in repeated or rowid else "known_words.miss")
+                if row["job"] in repeated or (rowid and self.existing == "skip"):
+                    row.update(skip=True, lookup=False, word_id=rowid)
+                    self.skipped += 1
+                    continue
+                if rowid and self.existing == "copy":
+                    copies.setdefault(rowid, []).append(row)
+            copied = self.db.fetch_rows(copies) if copies else {}
+            for rowid, copy_rows in copies.items():
+                if rowid not in copied: continue # deleted meanwhile, look it up
+                for row in copy_rows:
+                    row.update(zip(self.db.columns, copied[rowid][1:]), score=0, lookup=False)
+                    self.copied += 1
+            self.put(output, rows)
+
+    def fetch(self, source, output):
+        # rows are fetched in parallel, the per-host limiter keeps the request rate polite
+        def enrich(row):
+            if row.pop("lookup", True):
+                with self.metrics.timer("word"): # fetch + parse of one word, waits included
+                    row = Vocabulary.enrich(row, self.main_lang, self.second_lang, self.examples, self.meanings)
+            self.metrics.count("words")
+            with self.lock:
+                self.completed += 1
+                if self.on_progress: self.on_progress(self.completed, max(self.total, self.completed))
+            return row
+        with ThreadPoolExecutor(max_workers=max(1, Netzverb.workers)) as executor:
+            for rows in self.chunks(source):
+                for row in executor.map(enrich, rows): # in input order, each row as soon as it is ready
+                    self.put(output, [row])
+
+    def write(self, source):
+        # commit when a batch is full or when nothing else is ready, so slow lookups still show up quickly
+        batch = []
+        for rows in self.chunks(source):
+            batch.extend(rows)
+            if len(batch) >= self.insert_batch or source.empty():
+                self.insert(batch)
+                batch = []
+        if batch and not self.stopped.is_set(): self.insert(batch)
+
+    def insert(self, batch):
+        last_rowid = self.db.last_rowid()
+        with self.metrics.timer("db_write"):
+            saved = self.db.complete_jobs(self.worker, batch) # checkpoint
+        self.metrics.count("rows_saved", saved)
+        with self.lock: self.in_flight -= len(batch)
+        self.saved += saved
+        self.translated += sum(row["translation"] is not None for row in batch if not row.get("skip"))
+        if self.on_batch: self.on_batch(last_rowid, saved)
+
+
+def main():
+    # headless worker: python -m modules.pipeline [run id], can run next to the app to share a long run
+    from modules.DB_manager import DBManager
+    settings = json.loads((Path(__file__).parent.parent / "config/settings.json").read_text())
+    apply_settings(settings) # same page cache and tag memo as the app
+    db = DBManager()
+    db.create_table()
+    runs = [run for run in db.job_runs() if len(sys.argv) < 2 or run["id"] == int(sys.argv[1])]
+    for run in runs:
+        pipeline = ImportPipeline.resume(db, run, **settings.get("import", {}),
+            on_progress=lambda completed, total: print(f"{completed} / {total}"))
+        pipeline.run()
+        print(pipeline.metrics.report())
+        if pipeline.error: raise pipeline.error
+
+if __name__ == "__main__":
+    main()
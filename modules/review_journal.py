@@ -0,0 +1,29 @@
+import threading
+import time
+
+class ReviewJournal:
+    """In-memory buffer of flash card answers, written to the reviews table in small batches
+    so a crash loses at most the last few answers instead of the whole session."""
+
+    def __init__(self, db, flush_every=5):
+        self.db = db
+        self.flush_every = int(flush_every)
+        self.events = [] # (rowid, reviewed_at, grade, latency)
+        self.lock = threading.Lock()
+
+    def add(self, rowid: int, grade: int, latency: float | None = None):
+        with self.lock:
+            self.events.append((int(rowid), time.time(), int(grade), latency))
+            full = len(self.events) >= self.flush_every
+        if full: self.flush()
+
+    def flush(self) -> int:
+        with self.lock:
+            events, self.events = self.events, []
+        try:
+            self.db.record_reviews(events)
+        except Exception:
+            with self.lock: # keep the answers for the next flush
+                self.events = events + self.events
+            raise
+        return len(events)
@@ -0,0 +1,36 @@
+import time
+
+class Scheduler:
+    """SM-2 spaced repetition: works out the next review of a word from its state and the answer."""
+    # flash card buttons (points) -> SM-2 answer quality 0..5, below 3 counts as forgotten
+    qualities = {-1: 1, 1: 3, 2: 4, 3: 5} # Again, Hard, Good, Easy
+    min_ease = 1.3
+    start_ease = 2.5
+    relearn_minutes = 10 # forgotten words come back in the same day
+    easy_bonus = 1.3
+
+    @classmethod
+    def quality(self, points) -> int:
+        return self.qualities.get(points, 3)
+
+    @classmethod
+    def review(self, state: dict | None, points, now: float | None = None) -> dict:
+        """state has ease, interval (days) and reps; returns the new state with due_at (unix time)."""
+        now = time.time() if now is None else now
+        state = state or {"ease": self.start_ease, "interval": 0.0, "reps": 0}
+        ease, interval, reps = state["ease"], state["interval"], state["reps"]
+        q = self.quality(points)
+
+        ease = max(self.min_ease, ease + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+        if q < 3:
+            reps = 0
+            interval = 0.0
+            due_at = now + self.relearn_minutes * 60
+        else:
+            reps += 1
+            if reps == 1: interval = 1.0
+            elif reps == 2: interval = 6.0
+            else: interval = max(1.0, interval * ease)
+            if q == 5: interval *= self.easy_bonus
+            due_at = now + interval * 86400
+        return {"ease": ease, "interval": interval, "reps": reps, "due_at": due_at}
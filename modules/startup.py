@@ -0,0 +1,83 @@
+import builtins
+import importlib
+import sys
+import threading
+import time
+
+class LazyModule:
+    """Stand-in for a heavy module, the real import happens on first attribute access."""
+    profiler = None # StartupProfiler, records when deferred modules get loaded
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if self.profiler: self.profiler.deferred[self._name] = time.perf_counter() - start
+                    self.__dict__["_module"] = module
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+class StartupProfiler:
+    """Times the imports done while starting the app and the steps up to an interactive window.
+    Used by `python main.py --profile-startup`."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = {}  # module -> seconds, outermost import statements only
+        self.deferred = {} # lazily imported module -> seconds
+        self.marks = []    # (label, seconds since start)
+        self._original_import = builtins.__import__
+        self._local = threading.local()
+
+    def install(self):
+        LazyModule.profiler = self
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        builtins.__import__ = self._original_import
+
+    def _timed_import(self, name, *args, **kwargs):
+        depth = getattr(self._local, "depth", 0)
+        label = name
+        fromlist = args[2] if len(args) > 2 else kwargs.get("fromlist")
+        if name in sys.modules and fromlist: # "from package import module" may load a submodule
+            label = next((f"{name}.{item}" for item in fromlist if f"{name}.{item}" not in sys.modules), name)
+        if depth or label in sys.modules:
+            return self._original_import(name, *args, **kwargs)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, *args, **kwargs)
+        finally:
+            self._local.depth = depth
+            self.imports[label] = self.imports.get(label, 0) + time.perf_counter() - start
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.start))
+
+    def report(self, lazy_modules=()) -> str:
+        lines = ["Startup profile", "", "Imports at startup (ms):"]
+        for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1]):
+            if seconds >= 0.0005: lines.append(f"  {name:<32}{seconds * 1000:>9.1f}")
+        lines += ["", "Deferred modules:"]
+        for module in lazy_modules:
+            state = f"loaded ({self.deferred.get(module._name, 0) * 1000:.1f} ms)" if module.loaded else "not loaded"
+            lines.append(f"  {module._name:<32}{state}")
+        lines += ["", "Timeline (ms since start):"]
+        for label, seconds in self.marks:
+            lines.append(f"  {label:<32}{seconds * 1000:>9.1f}")
+        return "\n".join(lines)
@@ -1,11 +1,31 @@
+from __future__ import annotations
+import os
 import re
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from collections import deque
+from importlib.util import find_spec
 from pathlib import Path
-import spacy # python -m spacy download de_core_news_sm
+from typing import TYPE_CHECKING
+from modules.startup import LazyModule
+from modules.metrics import timer
+from modules.netz_cache import NetzCache, TagCache
+
+# heavy dependencies are imported on first use, so the main window opens without them
+requests = LazyModule("requests")
+bs4 = LazyModule("bs4")
+pd = LazyModule("pandas")
+spacy = LazyModule("spacy") # python -m spacy download de_core_news_sm
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+# brotli is optional, requests/urllib3 only decode "br" when it is installed
+ACCEPT_ENCODING = "gzip, deflate, br" if find_spec("brotli") else "gzip, deflate"
+# lxml is optional and noticeably faster than the built-in parser
+HTML_PARSER = "lxml" if find_spec("lxml") else "html.parser"
 
 """ so word groups would be:
         Verbs: VERB, AUX;
@@ -64,7 +84,30 @@ class helper:
             wrapped_lines = textwrap.wrap(text, max_length)
             return "\n".join(wrapped_lines[:])
         return text  
-   
+
+
+class RateLimiter:
+    """Token bucket: allows `rate` requests per second with bursts of up to `capacity`, no limit when rate <= 0."""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0: return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
 class Netzverb: 
     # base_url = "https://www.verbformen.de/?w="
@@ -76,6 +119,86 @@ class Netzverb:
     nouns = ["der", "die", "das", "NOUN", "PROPN"]
     verbs = ["VERB", "AUX"]
     adjectives = ["ADJ", "ADV"]
+    conjunctions = ["CONJ", "CCONJ", "SCONJ"]
+
+    # Fetch engine settings (overridden from settings.json -> "network")
+    workers = 4                 # parallel lookups in get_netz_info
+    requests_per_second = 2.0   # politeness limit per host, 0 = no limit
+    burst = 2                   # requests allowed back to back before the limit kicks in
+    max_retries = 3
+    backoff = 2.0               # seconds before the first retry, doubled every attempt
+    retry_statuses = (429, 500, 502, 503, 504)
+    connect_timeout = 5.0       # seconds
+    read_timeout = 20.0
+
+    cache = None # NetzCache, set up by the app from settings.json -> "cache"
+    metrics = None # Metrics of the running import, see ImportPipeline
+
+    # tags kept when parsing a page, everything else is skipped by the parser
+    page_sections = ["h1", "section", "dl"]
+
+    _limiters = {} # host -> RateLimiter
+    _limiters_lock = threading.Lock()
+    _session = None # shared requests.Session, one connection pool for all workers
+    _session_lock = threading.Lock()
+    latencies = deque(maxlen=1000) # seconds per request, most recent last
+
+    @classmethod
+    def configure(self, **options):
+        for key, value in options.items():
+            if key in ("workers", "burst", "max_retries"): setattr(self, key, int(value))
+            elif key in ("requests_per_second", "backoff", "connect_timeout", "read_timeout"):
+                setattr(self, key, float(value))
+            elif key in ("base_url", "noun_url", "conj_url") and value: setattr(self, key, str(value))
+            elif key == "host" and value: self.set_host(value)
+        if os.environ.get("NETZVERB_HOST"): # e.g. the stand-in server of benchmarks/netz_server.py
+            self.set_host(os.environ["NETZVERB_HOST"])
+        with self._limiters_lock: # limiters are rebuilt with the new rate on next request
+            self._limiters.clear()
+        with self._session_lock: # pool size follows the number of workers
+            if self._session: self._session.close()
+            self._session = None
+
+    @classmethod
+    def set_host(self, host):
+        # same paths on another server, e.g. "http://127.0.0.1:8765"
+        for key in ("base_url", "noun_url", "conj_url"):
+            url = urlsplit(getattr(self, key))
+            setattr(self, key, host.rstrip("/") + getattr(self, key)[len(f"{url.scheme}://{url.netloc}"):])
+
+    @classmethod
+    def get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(1, self.workers))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+                self._session = session
+            return self._session
+
+    @classmethod
+    def latency_stats(self):
+        # summary of recent request latencies in seconds
+        values = sorted(self.latencies)
+        if not values: return {"requests": 0}
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+        return {
+            "requests": len(values),
+            "mean": sum(values) / len(values),
+            "p50": pick(0.5),
+            "p95": pick(0.95),
+            "max": values[-1],
+        }
+
+    @classmethod
+    def get_limiter(self, request_url):
+        host = urlsplit(request_url).netloc
+        with self._limiters_lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.requests_per_second, self.burst)
+            return self._limiters[host]
 
     @classmethod
     def get_lang_code(self, lang_name):
@@ -84,6 +207,12 @@ class Netzverb:
                 return code
         return "en"  # Return lang_name if no match is found
 
+    @classmethod
+    def get_url(self, word, word_type=None):
+        if word_type in self.nouns: return f"{self.noun_url}{word}"
+        if word_type in self.conjunctions: return f"{self.conj_url}{word}"
+        return f"{self.base_url}{word}"
+
     @classmethod
     def get_html_response(self, word):
         request_url = f"{self.base_url}{word}"
@@ -101,15 +230,133 @@ class Netzverb:
 
     @classmethod
     def _fetch_response(self, request_url):
-        try:
-            response = requests.get(request_url)
-            response.raise_for_status()  # Raise HTTPError for bad responses
-            time.sleep(2)
-            return BeautifulSoup(response.content, "html.parser")
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching the URL")
-            return None
+        content = self.fetch_page(request_url)
+        return bs4.BeautifulSoup(content, "html.parser") if content else None
+
+    @classmethod
+    def fetch_page(self, request_url) -> bytes | None:
+        # raw html of a Netzverb page, None if the word has no page or the request failed
+        if self.cache:
+            cached = self.cache.get(request_url)
+            if self.metrics: self.metrics.count("page_cache.miss" if cached is None else "page_cache.hit")
+            if cached is not None:
+                content, present = cached
+                return content if present else None
+
+        content = self._download(request_url)
+        if content is None: return None
+        present = self.is_present(content)
+        if self.cache: # unknown words are cached too, so they are not requested again
+            self.cache.put(request_url, content, present)
+        return content if present else None
+
+    @classmethod
+    def is_present(self, content: bytes) -> bool:
+        # same test as check_netz_presence without building a soup
+        return re.search(rb"<h1\b[^>]*>Definition", content) is not None
+
+    @classmethod
+    def _download(self, request_url):
+        limiter = self.get_limiter(request_url)
+        session = self.get_session()
+        for attempt in range(self.max_retries + 1):
+            with timer(self.metrics, "wait"): # rate limit
+                limiter.acquire()
+            try:
+                start = time.perf_counter()
+                response = session.get(request_url, timeout=(self.connect_timeout, self.read_timeout))
+                self.latencies.append(time.perf_counter() - start)
+                if self.metrics:
+                    self.metrics.record("fetch", self.latencies[-1])
+                    self.metrics.count(f"http.{response.status_code}")
+                if response.status_code in self.retry_statuses and attempt < self.max_retries:
+                    with timer(self.metrics, "backoff"):
+                        time.sleep(self._retry_delay(attempt, response))
+                    continue
+                response.raise_for_status()  # Raise HTTPError for bad responses
+                return response.content
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if self.metrics: self.metrics.count("http.failed")
+                if attempt < self.max_retries:
+                    with timer(self.metrics, "backoff"):
+                        time.sleep(self._retry_delay(attempt))
+                    continue
+                print(f"Error fetching the URL {request_url}: {e}")
+                return None
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching the URL {request_url}: {e}")
+                return None
+
+    @classmethod
+    def _retry_delay(self, attempt, response=None):
+        # honour Retry-After from 429/503 responses, otherwise exponential backoff
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * 2 ** attempt
         
+    @classmethod
+    def parse_page(self, content: bytes, languages=(), examples: int = 0, meanings: int = 0) -> dict:
+        """Extract every field get_netz_info needs from a page in one pass over the parsed sections."""
+        record = {"present": False, "word": None, "verb": None,
+                  "translations": {}, "examples": None, "meanings": None}
+        soup = bs4.BeautifulSoup(content, HTML_PARSER, parse_only=bs4.SoupStrainer(self.page_sections))
+        languages = [lang for lang in languages if lang]
+        example_list = []
+        first_section = True
+
+        for tag in soup.find_all(["h1", "div", "section", "dd", "a"]):
+            match tag.name:
+                case "h1":
+                    if re.match(r"^Definition", tag.string or ""): record["present"] = True
+                case "div":
+                    if record["word"] is None and tag.get("class") == ["rCntr", "rClear"]:
+                        record["word"] = tag.text.strip()
+                case "section" if tag.get("class") == ["rBox", "rBoxWht"]:
+                    if first_section: # word class is shown in the first box
+                        first_section = False
+                        span = tag.find("span", class_="rInf")
+                        verb = span.find("span", attrs={"title": "Verb"}) if span else None
+                        if verb: record["verb"] = verb.text.upper()
+                    h2 = tag.find("h2")
+                    if meanings and record["meanings"] is None and h2 and h2.text == "Bedeutungen":
+                        record["meanings"] = self._section_meanings(tag, meanings)
+                case "dd":
+                    lang = tag.get("lang")
+                    if lang in languages and lang not in record["translations"]:
+                        spans = tag.find_all("span")
+                        if len(spans) > 1:
+                            words = [word.strip() for word in spans[1].text.split(",")]
+                            record["translations"][lang] = ", ".join(words[:4])
+                case "a":
+                    href = tag.get("href", "")
+                    if examples and href.startswith("https://www.satzapp.de/?t="):
+                        example_list.append(href.split("=")[1])
+
+        if record["present"] and record["word"] is None and self.page_sections is not None:
+            # layout changed and the word header is outside the parsed sections, use the full page
+            full = bs4.BeautifulSoup(content, HTML_PARSER).find("div", class_="rCntr rClear")
+            if full: record["word"] = full.text.strip()
+        if examples and example_list: record["examples"] = "; ".join(example_list[:examples])
+        return record
+
+    @classmethod
+    def _section_meanings(self, section, n):
+        list_prefixes = ("a.", "b.", "c.", "d.", "e.")
+        meanings = []
+        dl = section.find("dl", class_="wNrn")
+        if not dl: return None
+        for dd in dl.find_all("dd"):
+            text = dd.text.strip()
+            if text.startswith(list_prefixes):
+                text = text[2:]
+            for part in text.split(";"):
+                part = part.strip()
+                if part:
+                    meanings.append(part)
+        return "; ".join(meanings[:n])
+
     @classmethod # Check whether Netzverb has a page related to specific word
     def check_netz_presence(self, soup: BeautifulSoup, word):
         if soup == None: return False
@@ -180,14 +427,72 @@ class Netzverb:
             return(part[0].text.upper())
 
 class Vocabulary:
+    tag_cache = None  # TagCache, set up by the app together with the page cache
+    metrics = None    # Metrics of the running import, see ImportPipeline
+    batch_size = 256  # words per nlp.pipe batch
+    n_process = 1     # spaCy worker processes for tagging
+
+    _nlp = None # spaCy model, loaded once per process
+    _nlp_lock = threading.Lock()
+
     def __init__(self):
-        self.data = pd.DataFrame()
+        self._data = None
+
+    @property
+    def data(self) -> pd.DataFrame:
+        if self._data is None: self._data = pd.DataFrame() # created on first use, pandas loads lazily
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @classmethod
+    def warm_up(self):
+        # import the heavy dependencies and load the spaCy model ahead of the first translation
+        for module in (pd, requests, bs4): module._load()
+        Netzverb.get_session()
+        try:
+            self.get_nlp()
+        except (ImportError, OSError) as e:
+            print(f"spaCy model is not available: {e}")
+
+    @classmethod
+    def get_nlp(self):
+        with self._nlp_lock:
+            if self._nlp is None:
+                self._nlp = spacy.load("de_core_news_sm", disable=["ner", "parser"])
+            return self._nlp
+
+    @classmethod
+    def configure(self, batch_size=None, n_process=None):
+        if batch_size: self.batch_size = int(batch_size)
+        if n_process: self.n_process = int(n_process)
+
+    @classmethod
+    def tag_words(self, words) -> dict:
+        # word -> POS for every word, the model only sees words missing from the memo
+        words = list(dict.fromkeys(words))
+        tags = self.tag_cache.get_many(words) if self.tag_cache else {}
+        new_words = [word for word in words if word not in tags]
+        if self.metrics and self.tag_cache:
+            self.metrics.count("tag_cache.hit", len(words) - len(new_words))
+            self.metrics.count("tag_cache.miss", len(new_words))
+        if new_words:
+            nlp = self.get_nlp()
+            with timer(self.metrics, "tag"):
+                docs = nlp.pipe(new_words, batch_size=self.batch_size, n_process=self.n_process)
+                new_tags = {word: (doc[0].pos_ if len(doc) else "X") for word, doc in zip(new_words, docs)}
+            if self.tag_cache: self.tag_cache.put_many(new_tags)
+            tags.update(new_tags)
+        return tags
         
     def read_data(self, file):
         self.data = (pd.read_csv(file, header=None, names=["Input"])
                     .dropna()
                     .reset_index(drop=True))
 
+    @classmethod
     def noun_type(self, phrase):
         articles = ["der", "die", "das"]
         words = phrase.strip().split()
@@ -199,9 +504,10 @@ class Vocabulary:
             return None, phrase.strip()
     
     def word_type(self):
-        nlp = spacy.load("de_core_news_sm", disable=["ner", "parser"])
-        func = lambda x: nlp(x)[0].pos_
-        self.data.type = self.data.type.fillna(self.data.german.apply(func))
+        untyped = self.data.type.isna()
+        if not untyped.any(): return
+        tags = self.tag_words(self.data.loc[untyped, "german"])
+        self.data.loc[untyped, "type"] = self.data.loc[untyped, "german"].map(tags)
 
     def clean_data(self):
         self.data[["type", "german"]] = self.data["Input"].apply(lambda x: pd.Series(self.noun_type(x)))
@@ -221,60 +527,82 @@ class Vocabulary:
 
         print(f"Translations saved to {out_location}")
 
+    @classmethod
+    def language_codes(self, main_lang, second_lang=None) -> tuple:
+        if len(main_lang) > 2: main_lang = Netzverb.get_lang_code(main_lang)
+        if second_lang and len(second_lang) > 2: second_lang = Netzverb.get_lang_code(second_lang)
+        return main_lang, second_lang
+
+    @classmethod
+    def enrich(self, row, main_lang, second_lang=None, examples=0, meanings=0):
+        # fills base form, translations, example and meaning of one row (dict or Series) from Netzverb
+        word = row["german"]
+        row["score"] = 0
+
+        content = Netzverb.fetch_page(Netzverb.get_url(word, row["type"]))
+        if content is None: return row # word is not present on Netzverb
+        with timer(self.metrics, "parse"):
+            page = Netzverb.parse_page(content, (main_lang, second_lang), examples, meanings)
+        if not page["present"]: return row
+
+        # Get the base form and update German/Type columns
+        if row["type"] in Netzverb.nouns and page["word"]:
+            type_and_word = page["word"].split(sep=',',maxsplit=1)
+            if len(type_and_word) == 2:
+                row["german"], row["type"] = type_and_word
+                row["type"] = row["type"].strip()
+                row["german"] = row["german"].strip()
+                
+        if row["type"] in Netzverb.verbs: 
+            if isinstance(page["word"], str):
+                row["german"] = page["word"]
+
+        # Fill translations and other data
+        row["translation"] = page["translations"].get(main_lang)
+        if second_lang: row["second_translation"] = page["translations"].get(second_lang)
+        if examples: row["example"] = page["examples"]
+        if meanings: row["meaning"] = page["meanings"]
+        
+        return row
+
     def get_netz_info(self, main_lang, second_lang=None, examples=0, meanings=0, progress_callback=None, callback = None):
         # Initialize columns dynamically
         columns = ["translation", "second_translation", "example", "meaning", "score"]
-        if len(main_lang) > 2: main_lang = Netzverb.get_lang_code(main_lang)
-        if second_lang and len(second_lang) > 2: second_lang = Netzverb.get_lang_code(second_lang)
+        main_lang, second_lang = self.language_codes(main_lang, second_lang)
 
         for col in columns:
             self.data[col] = None
 
-        def process_row(row):
-            word = row["german"]
-            row["score"] = 0
-            
-            print(f"Parsing for {word}")
-            if progress_callback: progress_callback(row.name + 1, self.data.shape[0])
-
-            # Determine the correct Netzverb method
-            if row["type"] in Netzverb.nouns:
-                soup = Netzverb.get_noun_html_response(word)
-            elif row["type"] in ["CONJ", "CCONJ", "SCONJ"]:
-                soup = Netzverb.get_conj_html_response(word)
-            else:
-                soup = Netzverb.get_html_response(word)
-
-            # Skip processing if word is not present
-            if not Netzverb.check_netz_presence(soup, word):
-                return row
-
-            # Get the base form and update German/Type columns
-            if row["type"] in Netzverb.nouns: 
-                base_form = Netzverb.get_word(soup)
-                type_and_word = base_form.split(sep=',',maxsplit=1)
-                if len(type_and_word) == 2:
-                    row["german"], row["type"] = type_and_word
-                    row["type"] = row["type"].strip()
-                    row["german"] = row["german"].strip()
-                    
-            if row["type"] in Netzverb.verbs: 
-                base_form = Netzverb.get_word(soup)
-                if isinstance(base_form, str):
-                    row["german"] = base_form
-
-            # Fill translations and other data
-            row["translation"] = Netzverb.get_translation(soup, main_lang)
-            if second_lang: row["second_translation"] = Netzverb.get_translation(soup, second_lang)
-            if examples: row["example"] = Netzverb.get_example(soup, examples)
-            if meanings: row["meaning"] = Netzverb.get_meaning(soup, meanings)
-            
+        total = self.data.shape[0]
+        completed = 0
+        progress_lock = threading.Lock()
+
+        def run_row(row):
+            nonlocal completed
+            row = self.enrich(row, main_lang, second_lang, examples, meanings)
+            with progress_lock:
+                completed += 1
+                if progress_callback: progress_callback(completed, total)
             return row
 
-        # Apply processing function to all rows
-        self.data = self.data.apply(process_row, axis=1)
+        # Rows are fetched in parallel, the per-host limiter keeps the request rate polite.
+        # executor.map yields results in input order.
+        if total:
+            rows = [row for _, row in self.data.iterrows()]
+            with ThreadPoolExecutor(max_workers=max(1, Netzverb.workers)) as executor:
+                self.data = pd.DataFrame(list(executor.map(run_row, rows)))
         if callback: callback()
 
 
+def apply_settings(settings: dict):
+    # network, page/tag cache and tagging settings of settings.json, shared by the app and headless workers
+    Netzverb.configure(**settings.get("network", {}))
+    cache_settings = dict(settings.get("cache", {}))
+    if cache_settings.pop("enabled", True):
+        Netzverb.cache = NetzCache(**cache_settings)
+        Vocabulary.tag_cache = TagCache(Netzverb.cache.path)
+    Vocabulary.configure(**settings.get("tagging", {}))
+
+
 if __name__ == "__main__":
     pass